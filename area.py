@@ -1,14 +1,17 @@
 from grid import Grid
-from cell import Cell
+from cell import Cell, UNSET
+from indexed_set import IndexedSet
 import random
 import math
+import numpy as np
 import constants as c
 
 
 class Area():
     def __init__(self, id: int, grid: Grid, start_x: int, start_y: int,
                  type: int = c.CENTER, sea_margin: float = 0.25,
-                 growth: int = 20, relative_growth: float = 0.3):
+                 growth: int = 20, relative_growth: float = 0.3,
+                 rng: random.Random = None):
         self.id: int = id
         self.grid: Grid = grid
         self.start_x: int = start_x
@@ -17,18 +20,27 @@ class Area():
         self.sea_margin: float = sea_margin
         self.growth: int = growth
         self.relative_growth = relative_growth
+        self.rng: random.Random = rng if rng != None else random.Random()
         self.currency: int = growth
         self.alive: bool = True
         self.area: int = 0
         self.land_area: int = 0
         self.sea_area: int = 0
         self.claimed_cells: list[Cell] = []
-        self.queued_cells: list[Cell] = []
+        # Cells to expand from. Cells claimed during an expansion
+        # wait in the list of new cells until the expansion is over
+        self.queued_cells: IndexedSet = IndexedSet()
+        self.new_cells: list[Cell] = []
 
         self.west_end: dict[int, int] = {start_y: start_x}
         self.east_end: dict[int, int] = {start_y: start_x}
         self.north_end: dict[int, int] = {start_x: start_y}
         self.south_end: dict[int, int] = {start_x: start_y}
+        # Northmost and southmost y-value of each diagonal, keyed like the diagonal distances
+        self.northwest_end: dict[int, int] = {start_x - start_y: start_y}
+        self.southeast_end: dict[int, int] = {start_x - start_y: start_y}
+        self.northeast_end: dict[int, int] = {start_x + start_y: start_y}
+        self.southwest_end: dict[int, int] = {start_x + start_y: start_y}
 
         self.horizontal_distance: dict[int, int] = {}
         self.vertical_distance: dict[int, int] = {}
@@ -36,6 +48,7 @@ class Area():
         self.descending_distance: dict[int, int] = {}
 
         self.claim_cell(start_x, start_y)
+        self._awaken_cells()
 
     def _set_boundary(self, minimum: dict[int, int], maximum: dict[int, int],
                       key: int, value: int) -> None:
@@ -44,7 +57,11 @@ class Area():
         Arguments:
             self.west_end, self.east_end, y, x
         Or:
-            self.north_end, self.south_end, x, y"""
+            self.north_end, self.south_end, x, y
+        Or:
+            self.northwest_end, self.southeast_end, x - y, y
+        Or:
+            self.northeast_end, self.southwest_end, x + y, y"""
         if key in minimum:
             if value < minimum[key]:
                 minimum[key] = value
@@ -78,21 +95,81 @@ class Area():
         """Claims a cell. Updates boundaries and pays cell cost"""
         cell = self.grid.get(x, y)
         cell.area = self.id
-        cell.active = False
         self.area += 100
         self.currency -= 1
-        self.queued_cells.append(cell)
+        self.new_cells.append(cell)
         self._set_boundary(self.west_end, self.east_end, y, x)
         self._set_boundary(self.north_end, self.south_end, x, y)
+        self._set_boundary(self.northwest_end, self.southeast_end, x - y, y)
+        self._set_boundary(self.northeast_end, self.southwest_end, x + y, y)
         self._add_distance(x, y)
 
+    def _find_ends(self, keys: np.ndarray, values: np.ndarray) -> tuple[dict[int, int]]:
+        """Returns the minimum and maximum value for each key"""
+        order = np.lexsort((values, keys))
+        keys = keys[order]
+        values = values[order]
+        unique_keys, first = np.unique(keys, return_index=True)
+        last = np.append(first[1:], len(keys)) - 1
+        return (dict(zip(unique_keys.tolist(), values[first].tolist())),
+                dict(zip(unique_keys.tolist(), values[last].tolist())))
+
+    def _count_keys(self, keys: np.ndarray) -> dict[int, int]:
+        """Returns the amount of times each key occurs"""
+        unique_keys, counts = np.unique(keys, return_counts=True)
+        return dict(zip(unique_keys.tolist(), counts.tolist()))
+
+    def claim_region(self, xs: np.ndarray, ys: np.ndarray) -> None:
+        """Replaces all claimed cells with the cells at coordinates (xs, ys),
+        in the given order. Updates boundaries and distances.
+        The area is left fully expanded"""
+        self.grid.area[ys - self.grid.start_y, xs - self.grid.start_x] = self.id
+        self.claimed_cells = [Cell(self.grid, x, y)
+                              for x, y in zip(xs.tolist(), ys.tolist())]
+        self.queued_cells = IndexedSet()
+        self.new_cells = []
+        self.alive = False
+        self.area = 100 * len(self.claimed_cells)
+
+        self.west_end, self.east_end = self._find_ends(ys, xs)
+        self.north_end, self.south_end = self._find_ends(xs, ys)
+        self.northwest_end, self.southeast_end = self._find_ends(xs - ys, ys)
+        self.northeast_end, self.southwest_end = self._find_ends(xs + ys, ys)
+
+        self.horizontal_distance = self._count_keys(ys)
+        self.vertical_distance = self._count_keys(xs)
+        self.ascending_distance = self._count_keys(xs - ys)
+        self.descending_distance = self._count_keys(xs + ys)
+
     def _awaken_cells(self) -> int:
-        """Counts amount of cells which the area can expand from"""
-        amount = 0
-        for cell in self.queued_cells:
-            cell.active = True
-            amount += 1
-        return amount
+        """Queues newly claimed cells for expansion.
+        Returns the amount of cells which the area can expand from"""
+        for cell in self.new_cells:
+            self.queued_cells.add(cell)
+        self.new_cells = []
+        return len(self.queued_cells)
+
+    def _expand_from(self, cell: Cell) -> None:
+        """Claims all vacant cells next to a queued cell
+        and moves the queued cell to the claimed cells"""
+        grid = self.grid
+
+        for index in grid.get_neighbors(cell.x, cell.y, False):
+            if index >= 0:
+                row, column = divmod(index, grid.length)
+
+                if grid.area[row, column] == -1:
+                    self.claim_cell(column + grid.start_x, row + grid.start_y)
+
+        self.claimed_cells.append(cell)
+
+    def _grow(self, limit: int) -> None:
+        """Expands from random queued cells until the limit is reached
+        or growth currency runs out. Each queued cell is picked at most once"""
+        while limit > 0 and self.currency > 0 and len(self.queued_cells) > 0:
+            self._expand_from(self.queued_cells.pop_random(self.rng))
+            limit -= 1
+        self._awaken_cells()
 
     def expand(self) -> int:
         """Expands the area in random directions. Returns remaining growth currency.
@@ -101,70 +178,88 @@ class Area():
         If a plate has little space to expand, it will expand with greater focus
         to claim the vacant spaces.
         """
-        active_cells = self._awaken_cells()
-        limit = math.ceil(active_cells * 0.5)
+        active_cells = len(self.queued_cells)
         self.currency += self.growth
 
         if active_cells == 0:
             self.alive = False
             return 0
 
-        random.shuffle(self.queued_cells)
-
-        while limit > 0 and self.currency > 0:
-            cell = self.queued_cells[0]
-            if not cell.active:
-                break
-
-            for dir in range(0, 8, 2):
-                x, y = c.get_next_coordinates(cell.x, cell.y, dir)
-
-                try:
-                    if self.grid.get(x, y).area == -1:
-                        self.claim_cell(x, y)
-                except KeyError:
-                    pass
-
-            cell.active = False
-            limit -= 1
-            self.claimed_cells.append(cell)
-            self.queued_cells.remove(cell)
+        self._grow(math.ceil(active_cells * 0.5))
         return self.currency
 
     def expand_blindly(self) -> int:
         """Expands the area in random directions. Returns remaining growth currency.
         Areas will expand no faster than 1 cell per method call in any direction.
         Areas expansion should not speed up even if expansion choices are limited"""
-        active_cells = self._awaken_cells()
-        limit = math.ceil(active_cells * 0.5)
+        active_cells = len(self.queued_cells)
         self.currency += active_cells * self.relative_growth
 
         if active_cells == 0:
             self.alive = False
             return 0
 
-        random.shuffle(self.queued_cells)
-
-        while limit > 0 and self.currency > 0:
-            cell = self.queued_cells[0]
-            if not cell.active:
-                break
-
-            for dir in range(0, 8, 2):
-                x, y = c.get_next_coordinates(
-                    cell.x, cell.y, dir)
+        self._grow(math.ceil(active_cells * 0.5))
+        return self.currency
 
-                try:
-                    if self.grid.get(x, y).area == -1:
-                        self.claim_cell(x, y)
-                except KeyError:
-                    pass
+    def get_bounds(self) -> tuple[int]:
+        """Returns the smallest rectangle (west, north, east, south)
+        containing the area. All sides are inclusive"""
+        return (min(self.west_end.values()), min(self.north_end.values()),
+                max(self.east_end.values()), max(self.south_end.values()))
+
+    def get_window(self, margin: int = 0) -> tuple[Grid, np.ndarray]:
+        """Returns a subgrid covering the area and cells up to margin cells
+        beyond it, limited to the grid, and a boolean array marking
+        the area cells within it"""
+        west, north, east, south = self.get_bounds()
+        grid = self.grid
+        west = max(west - margin, grid.start_x)
+        north = max(north - margin, grid.start_y)
+        east = min(east + margin, grid.start_x + grid.length - 1)
+        south = min(south + margin, grid.start_y + grid.height - 1)
+        window = self.grid.get_subgrid(west, north, east - west + 1, south - north + 1)
+        return window, window.area == self.id
+
+    def _mark_scanned(self, mask: np.ndarray, ranks: np.ndarray, lengths: np.ndarray,
+                      first_margin: float, second_margin: float, flags: np.ndarray) -> None:
+        """Sets flags on area cells which are not within the margins of their line.
+        Ranks hold the position of each cell among the area cells of its line,
+        and lengths hold the amount of area cells on that line"""
+        first_skip = (lengths * first_margin).astype(int)
+        second_skip = (lengths * second_margin).astype(int)
+        include = lengths - first_skip - second_skip
+        # Only cells of this area are written, so areas can be scanned at the same time
+        flags[mask & (ranks >= first_skip) & (ranks < first_skip + include)] = True
+
+    def _scan_diagonals(self, north_end: dict[int, int], south_end: dict[int, int],
+                        ascending: bool) -> tuple[Grid, np.ndarray, np.ndarray, np.ndarray]:
+        """Returns a subgrid covering the diagonals of the area, a boolean array
+        marking the area cells within it, the rank of each area cell from north
+        to south among the area cells on its diagonal, and the amount
+        of area cells on that diagonal"""
+        west, north, east, south = self.get_bounds()
+        north = min(north_end.values())
+        south = max(south_end.values())
+        window = self.grid.get_subgrid(west, north, east - west + 1, south - north + 1)
+        mask = window.area == self.id
+
+        # Number the diagonals of the area from 0 and up
+        first = min(north_end)
+        last = max(north_end)
+        rows, columns = np.indices(mask.shape)
+
+        if ascending:
+            keys = columns - rows + west - north - first
+        else:
+            keys = columns + rows + west + north - first
+        keys = np.clip(keys, 0, last - first)
 
-            cell.active = False
-            self.claimed_cells.append(cell)
-            self.queued_cells.remove(cell)
-            limit -= 1
-        return self.currency
+        skewed = np.zeros((mask.shape[0], last - first + 1), int)
+        skewed[rows[mask], keys[mask]] = 1
+        lengths = skewed.sum(axis=0)[keys]
+        ranks = np.cumsum(skewed, axis=0)[rows, keys] - 1
+        return window, mask, ranks, lengths
 
     def _horizontal_land_scan(self, type: int, sea_margin: float, coastal_scan: bool = False) -> None:
         """Scans the area horizontally, finding valid land positions on each vertical"""
@@ -178,27 +273,11 @@ class Area():
             north_margin = sea_margin * 2
             south_margin = 0
 
-        for x in self.north_end.keys():
-            length = self.vertical_distance[x]
-            start = self.north_end[x]
-            end = self.south_end[x]
-
-            first_skip = int(length * north_margin)
-            second_skip = int(length * south_margin)
-            include = length - first_skip - second_skip
-
-            for y in range(start, end + 1):
-                if self.grid.get(x, y).area == self.id:
-                    if first_skip > 0:
-                        first_skip -= 1
-                    elif include > 0:
-                        if coastal_scan:
-                            self.grid.get(x, y).horizontal_coastal_check = True
-                        else:
-                            self.grid.get(x, y).horizontal_land_check = True
-                        include -= 1
-                    else:
-                        break
+        window, mask = self.get_window()
+        flags = window.horizontal_coastal_check if coastal_scan else window.horizontal_land_check
+        ranks = np.cumsum(mask, axis=0) - 1
+        lengths = np.broadcast_to(mask.sum(axis=0), mask.shape)
+        self._mark_scanned(mask, ranks, lengths, north_margin, south_margin, flags)
 
     def _vertical_land_scan(self, type: int, sea_margin: float, coastal_scan: bool = False) -> None:
         """Scans the area vertically, finding valid land positions on each horizontal"""
@@ -212,27 +291,11 @@ class Area():
             west_margin = sea_margin * 2
             east_margin = 0
 
-        for y in self.west_end.keys():
-            length = self.horizontal_distance[y]
-            start = self.west_end[y]
-            end = self.east_end[y]
-
-            first_skip = int(length * west_margin)
-            second_skip = int(length * east_margin)
-            include = length - first_skip - second_skip
-
-            for x in range(start, end + 1):
-                if self.grid.get(x, y).area == self.id:
-                    if first_skip > 0:
-                        first_skip -= 1
-                    elif include > 0:
-                        if coastal_scan:
-                            self.grid.get(x, y).vertical_coastal_check = True
-                        else:
-                            self.grid.get(x, y).vertical_land_check = True
-                        include -= 1
-                    else:
-                        break
+        window, mask = self.get_window()
+        flags = window.vertical_coastal_check if coastal_scan else window.vertical_land_check
+        ranks = np.cumsum(mask, axis=1) - 1
+        lengths = np.broadcast_to(mask.sum(axis=1)[:, np.newaxis], mask.shape)
+        self._mark_scanned(mask, ranks, lengths, west_margin, east_margin, flags)
 
     def _ascending_land_scan(self, type: int, sea_margin: float, coastal_scan: bool = False) -> None:
         """Scans the area diagonally, finding valid land position in northwest to southeast diagonal"""
@@ -246,32 +309,10 @@ class Area():
             northwest_margin = sea_margin * 2
             southeast_margin = 0
 
-        for start_x, length in self.ascending_distance.items():
-            first_skip = int(length * northwest_margin)
-            second_skip = int(length * southeast_margin)
-            include = length - first_skip - second_skip
-
-            if start_x < 0:
-                y = - start_x
-                start_x = 0
-            else:
-                y = 0
-
-            for x in range(start_x, self.grid.length):
-                if y == self.grid.height:
-                    break
-                elif self.grid.get(x, y).area == self.id:
-                    if first_skip > 0:
-                        first_skip -= 1
-                    elif include > 0:
-                        if coastal_scan:
-                            self.grid.get(x, y).ascending_coastal_check = True
-                        else:
-                            self.grid.get(x, y).ascending_land_check = True
-                        include -= 1
-                    else:
-                        break
-                y += 1
+        window, mask, ranks, lengths = self._scan_diagonals(
+            self.northwest_end, self.southeast_end, True)
+        flags = window.ascending_coastal_check if coastal_scan else window.ascending_land_check
+        self._mark_scanned(mask, ranks, lengths, northwest_margin, southeast_margin, flags)
 
     def _descending_land_scan(self, type: int, sea_margin: float, coastal_scan: bool = False) -> None:
         """Scans the area diagonally, finding valid land positions in northeast to southwest diagonal"""
@@ -285,79 +326,62 @@ class Area():
             northeast_margin = sea_margin * 2
             southwest_margin = 0
 
-        for start_x, length in self.descending_distance.items():
-            first_skip = int(length * northeast_margin)
-            second_skip = int(length * southwest_margin)
-            include = length - first_skip - second_skip
-
-            if start_x >= self.grid.length:
-                y = start_x - self.grid.length + 1
-                start_x = self.grid.length - 1
-            else:
-                y = 0
-
-            for x in range(start_x, -1, -1):
-                if y == self.grid.height:
-                    break
-                if self.grid.get(x, y).area == self.id:
-                    if first_skip > 0:
-                        first_skip -= 1
-                    elif include > 0:
-                        if coastal_scan:
-                            self.grid.get(x, y).descending_coastal_check = True
-                        else:
-                            self.grid.get(x, y).descending_land_check = True
-                        include -= 1
-                    else:
-                        break
-                y += 1
-
-    def create_land(self) -> None:
-        """Creates land or sea on this area, depending on area type"""
-        self.land_area = 0
-        self.sea_area = 0
+        window, mask, ranks, lengths = self._scan_diagonals(
+            self.northeast_end, self.southwest_end, False)
+        flags = window.descending_coastal_check if coastal_scan else window.descending_land_check
+        self._mark_scanned(mask, ranks, lengths, northeast_margin, southwest_margin, flags)
+
+    def find_land(self) -> tuple[Grid, np.ndarray, np.ndarray]:
+        """Scans the area for land, depending on area type. Returns a subgrid
+        covering the area, a boolean array marking the area cells within it
+        and a boolean array marking the cells which should be land.
+        Terrain is left unchanged"""
+        if self.type in (c.CENTER, c.NORTHEAST, c.SOUTHEAST,
+                         c.SOUTHWEST, c.NORTHWEST):
+            self._horizontal_land_scan(self.type, self.sea_margin)
+            self._vertical_land_scan(self.type, self.sea_margin)
+        elif self.type in (c.NORTH, c.EAST, c.SOUTH, c.WEST):
+            self._ascending_land_scan(self.type, self.sea_margin)
+            self._descending_land_scan(self.type, self.sea_margin)
+
+        window, mask = self.get_window()
 
         if self.type == c.LAND:
-            for cell in self.claimed_cells:
-                cell.set_terrain(c.LAND)
-                self.land_area += 100
+            land = mask
         elif self.type == c.WATER:
-            for cell in self.claimed_cells:
-                cell.set_terrain(c.WATER)
-                self.sea_area += 100
+            land = np.zeros_like(mask)
         else:
-            if self.type in (
-                    c.CENTER, c.NORTHEAST, c.SOUTHEAST,
-                    c.SOUTHWEST, c.NORTHWEST):
-                self._horizontal_land_scan(self.type, self.sea_margin)
-                self._vertical_land_scan(self.type, self.sea_margin)
-            else:
-                self._ascending_land_scan(self.type, self.sea_margin)
-                self._descending_land_scan(self.type, self.sea_margin)
-
-            for cell in self.claimed_cells:
-                if cell.passes_land_scan():
-                    cell.set_terrain(c.LAND)
-                    self.land_area += 100
-                else:
-                    cell.set_terrain(c.WATER)
-                    self.sea_area += 100
+            land = mask & ((window.horizontal_land_check & window.vertical_land_check)
+                           | (window.ascending_land_check & window.descending_land_check))
+        return window, mask, land
+
+    def set_land(self, window: Grid, mask: np.ndarray, land: np.ndarray) -> list[Cell]:
+        """Sets the terrain found by find_land. Returns the cells whose terrain changed"""
+        changed = window.set_terrain(mask, np.where(land, c.LAND, c.WATER))
+        self.land_area = 100 * int(land.sum())
+        self.sea_area = 100 * int(mask.sum()) - self.land_area
+        return window.get_marked(changed)
+
+    def create_land(self) -> list[Cell]:
+        """Creates land or sea on this area, depending on area type.
+        Returns the cells whose terrain changed"""
+        return self.set_land(*self.find_land())
 
     def convert_to_coastal(self, cell: Cell, water_rate: float) -> bool:
-        if c.is_terrain(cell.terrain, c.WATER) or random.random() > water_rate:
+        if c.is_terrain(cell.terrain, c.WATER) or self.rng.random() > water_rate:
             return False
 
-        surroundings = c.get_surroundings(cell.x, cell.y)
-        outskirts = self.grid.get_all(surroundings)
-
-        for neighbor in outskirts:
-            if neighbor != None and c.is_terrain(neighbor.terrain, c.WATER):
+        for terrain in self.grid.get_neighbor_terrain(cell.x, cell.y):
+            if c.is_terrain(terrain, c.WATER):
                 cell.set_terrain(c.WATER)
                 return True
         return False
 
     def create_coastal_landscape(self, type: int,
-                                 coastal_margin: float, water_rate: float) -> None:
+                                 coastal_margin: float, water_rate: float) -> list[Cell]:
+        """Turns water near the coast into land, then turns a share of
+        that land back into water where it touches water.
+        Returns the cells whose terrain may have changed"""
         if type in (c.CENTER, c.NORTHEAST, c.SOUTHEAST,
                     c.SOUTHWEST, c.NORTHWEST):
             self._horizontal_land_scan(type, coastal_margin, True)
@@ -374,46 +398,42 @@ class Area():
                 coastal_cells.append(cell)
 
         amount = int(len(coastal_cells) * water_rate)
-        random.shuffle(coastal_cells)
+        self.rng.shuffle(coastal_cells)
 
         while amount > 0:
             for cell in coastal_cells:
                 if self.convert_to_coastal(cell, water_rate):
                     amount -= 1
+        return coastal_cells
 
-    def sink(self) -> None:
-        """Clears all land from this plate. Clears land and sea area calculations"""
+    def sink(self) -> list[Cell]:
+        """Clears all land from this plate. Clears land and sea area calculations.
+        Returns the cells whose terrain changed"""
         self.land_area = 0
         self.sea_area = 0
+        window, mask = self.get_window()
+        changed = window.set_terrain(mask, c.WATER)
 
-        for cell in self.claimed_cells:
-            cell.set_terrain(c.WATER)
-            cell.horizontal_land_check = False
-            cell.vertical_land_check = False
-            cell.ascending_land_check = False
-            cell.descending_land_check = False
+        for flags in (window.horizontal_land_check, window.vertical_land_check,
+                      window.ascending_land_check, window.descending_land_check):
+            flags[mask] = False
+        return window.get_marked(changed)
+
+    def find_external_cells(self, window: Grid, mask: np.ndarray,
+                            external_terrain: int) -> np.ndarray:
+        """Returns a boolean array marking out-of-area cells
+        with terrain equal to the given external terrain"""
+        return ~mask & window.mask(external_terrain)
 
     def find_border_of_terrain(self, external_terrain: int) -> list[Cell]:
         """Returns a list of cells at the area border,
         so that the terrain beyond the area border equals the given terrain
         (for at least one cell immediately beyond the border)"""
-        border = []
-
-        for cell in self.claimed_cells:
-            for dir in range(8):
-                x, y = c.get_next_coordinates(cell.x, cell.y, dir)
-
-                try:
-                    neighbor: Cell = self.grid.get(x, y)
-                except KeyError:
-                    continue
-
-                if neighbor.area != self.id \
-                    and c.is_terrain(neighbor.terrain, external_terrain) \
-                        and neighbor not in border:
-                    cell.set_depth(1)
-                    border.append(cell)
-        return border
+        window, mask = self.get_window(1)
+        external = self.find_external_cells(window, mask, external_terrain)
+        border = window.find_distances(external, mask, 1) > 0
+        window.depth[border] = 1
+        return window.get_marked(border)
 
     def find_border_distance(self, external_terrain: int, max_distance: int = 100) -> list[list[Cell]]:
         """Returns a two-dimensional list of cells,
@@ -422,37 +442,12 @@ class Area():
         Sets the depth value of the cells to equal this distance.
         The algorithm terminates at max distance or when all cells have been found.
         """
-        for cell in self.claimed_cells:
-            cell.set_depth()
-
-        circles = []
-        current_circle = self.find_border_of_terrain(external_terrain)
-        circles.append(current_circle)
-
-        if max_distance == 1:
-            return circles
-
-        for distance in range(2, max_distance + 1):
-            previous_circle = current_circle
-            current_circle = []
-
-            for cell in previous_circle:
-                for dir in range(8):
-                    x, y = c.get_next_coordinates(cell.x, cell.y, dir)
-                    try:
-                        neighbor: Cell = self.grid.get(x, y)
-                    except KeyError:
-                        continue
-
-                    if neighbor.area == self.id and neighbor.has_depth() == False:
-                        neighbor.set_depth(distance)
-                        current_circle.append(neighbor)
-
-            if len(current_circle) > 0:
-                circles.append(current_circle)
-            else:
-                return circles
-        return circles
+        window, mask = self.get_window(1)
+        external = self.find_external_cells(window, mask, external_terrain)
+        distances = window.find_distances(external, mask, max_distance)
+        window.depth[mask] = np.where(distances[mask] > 0, distances[mask], UNSET)
+        return [window.get_marked(distances == distance)
+                for distance in range(1, max(int(distances.max()), 1) + 1)]
 
     def find_border_offset(self, internal_terrain: int, external_terrain: int,
                            min_distance: int, max_distance: int) -> list[Cell]:
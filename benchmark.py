@@ -0,0 +1,302 @@
+"""Times the map generation pipeline.
+
+Usage:
+    python benchmark.py --save       Stores the results as a baseline
+    python benchmark.py              Compares the results with the baseline
+
+The baseline is kept in benchmark_baseline.json next to this script.
+The committed baseline was measured on a single-core machine. Timings depend
+on the machine, so run with --save on your own machine before making changes
+and compare against that. Another file can be used with --baseline.
+Short benchmarks are repeated until they have run for MINIMUM_TIME seconds.
+A benchmark counts as a regression when it is slower than the baseline by more
+than --tolerance of the baseline time plus --noise seconds. On shared or virtual
+machines whose speed drifts between runs, raise both.
+"""
+from time import perf_counter
+from typing import Callable
+from grid import Grid
+from world import World
+from area import Area
+import argparse
+import gc
+import json
+import os
+import numpy as np
+import constants as c
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+SEED = 1
+# Side of the square areas used by the diagonal scan benchmark
+SCAN_AREA_SIZE = 20
+# Seconds a short benchmark is repeated for, so that single calls do not decide the time
+MINIMUM_TIME = 0.2
+
+
+def create_world(regions: int, areas: int, fixed_growth: bool = False,
+                 wobble_mode: str = c.CELLULAR_AUTOMATON) -> World:
+    """Creates a world with areas placed but not expanded"""
+    world = World(regions, SEED, wobble_mode)
+    world.create_areas(total_amount=areas, sea_amount=0, land_amount=0,
+                       sea_margin=0.15, fixed_growth=fixed_growth)
+    return world
+
+
+def create_map(regions: int, areas: int, wobble_mode: str = c.CELLULAR_AUTOMATON) -> World:
+    """Creates a world with land, coastlines and area boundaries"""
+    world = create_world(regions, areas, wobble_mode=wobble_mode)
+    world.build_areas()
+    world.create_land()
+    world.find_boundaries(world.square_miles)
+    world.update_coastlines(world.square_miles)
+    return world
+
+
+def create_mountains(world: World) -> None:
+    """Places mountains along the coast of every area"""
+    for area in world.areas:
+        for cell in area.find_border_offset(c.LAND, c.WATER, 2, 4):
+            cell.set_terrain(c.MOUNTAIN)
+            cell.calculate_mountain_depth(2, 4)
+
+
+def find_window(world: World, mask: np.ndarray) -> tuple[int, int]:
+    """Returns the corner region of the 4x4 region zoom window
+    with the most marked square miles"""
+    regions = mask.shape[0] // 10
+    counts = mask.reshape(regions, 10, regions, 10).sum(axis=(1, 3))
+    windows = np.lib.stride_tricks.sliding_window_view(counts, (4, 4)).sum(axis=(2, 3))
+    y, x = np.unravel_index(np.argmax(windows), windows.shape)
+    return int(x), int(y)
+
+
+def find_coast_window(world: World) -> tuple[int, int]:
+    """Returns the corner region of the zoom window with the longest coastline"""
+    land = c.get_terrain_mask(world.square_miles.terrain, c.LAND)
+    coast = np.zeros_like(land)
+    coast[:, 1:] |= land[:, 1:] != land[:, :-1]
+    coast[1:, :] |= land[1:, :] != land[:-1, :]
+    return find_window(world, coast)
+
+
+def time_loop(function: Callable[[], object], setup: Callable[[], object] = None) -> float:
+    """Calls the function until it has run for MINIMUM_TIME seconds in total
+    and returns the average time of one call, like timeit does.
+    Setup is called before each call and is not timed"""
+    total = 0.0
+    calls = 0
+
+    while total < MINIMUM_TIME:
+        if setup != None:
+            setup()
+        start = perf_counter()
+        function()
+        total += perf_counter() - start
+        calls += 1
+    return total / calls
+
+
+def time_grid(regions: int, areas: int) -> float:
+    return time_loop(lambda: Grid(regions * 10, regions * 10))
+
+
+def time_relative_growth(regions: int, areas: int) -> float:
+    world = create_world(regions, areas)
+    start = perf_counter()
+    world.build_areas()
+    return perf_counter() - start
+
+
+def time_fixed_growth(regions: int, areas: int) -> float:
+    world = create_world(regions, areas, fixed_growth=True)
+    start = perf_counter()
+    world.build_areas()
+    return perf_counter() - start
+
+
+def time_create_land(regions: int, areas: int) -> float:
+    world = create_world(regions, areas)
+    world.build_areas()
+
+    for area in world.areas:
+        area.type = c.CENTER
+    terrain = world.square_miles.terrain.copy()
+
+    def create_land() -> None:
+        for area in world.areas:
+            area.create_land()
+    return time_loop(create_land, lambda: np.copyto(world.square_miles.terrain, terrain))
+
+
+def time_diagonal_scans(regions: int, areas: int) -> float:
+    """Scans areas of a fixed size. The time should depend
+    on the amount of areas, not on the size of the world"""
+    grid = Grid(regions * 10, regions * 10)
+    per_row = grid.length // SCAN_AREA_SIZE
+    scanned = []
+
+    for i in range(areas):
+        x = i % per_row * SCAN_AREA_SIZE
+        y = i // per_row * SCAN_AREA_SIZE
+        area = Area(i, grid, x, y, c.NORTH)
+        ys, xs = np.mgrid[y: y + SCAN_AREA_SIZE, x: x + SCAN_AREA_SIZE]
+        area.claim_region(xs.ravel(), ys.ravel())
+        scanned.append(area)
+
+    def scan() -> None:
+        for area in scanned:
+            area._ascending_land_scan(area.type, area.sea_margin)
+            area._descending_land_scan(area.type, area.sea_margin)
+    return time_loop(scan)
+
+
+def time_update_coastlines(regions: int, areas: int) -> float:
+    world = create_map(regions, areas)
+    return time_loop(lambda: world.update_coastlines(world.square_miles))
+
+
+def time_find_boundaries(regions: int, areas: int) -> float:
+    world = create_map(regions, areas)
+    return time_loop(lambda: world.find_boundaries(world.square_miles))
+
+
+def time_boundary_wobble(regions: int, areas: int, mode: str = c.SEQUENTIAL) -> float:
+    """Generates the square kilometers of the zoom window with the longest coastline
+    in the given wobble mode, without reusing stored tiles"""
+    world = create_map(regions, areas, mode)
+    x, y = find_coast_window(world)
+    start = perf_counter()
+    world.kilometers.assemble(x, y, 4, 4, store=False)
+    return perf_counter() - start
+
+
+def time_boundary_wobble_automaton(regions: int, areas: int) -> float:
+    return time_boundary_wobble(regions, areas, c.CELLULAR_AUTOMATON)
+
+
+def time_zoom_in(regions: int, areas: int) -> float:
+    world = create_map(regions, areas)
+    start = perf_counter()
+    world.zoom_in(0, 0)
+    return perf_counter() - start
+
+
+def time_create_heightmaps(regions: int, areas: int) -> float:
+    """Creates the heightmaps of the zoom window with the most mountains"""
+    world = create_map(regions, areas)
+    create_mountains(world)
+    world.zoom_in(*find_window(world, world.square_miles.mask(c.MOUNTAIN)))
+    assert len(world.get_heightmap_coordinates(world.zoomed_square_miles)) > 0, \
+        "no mountains to create heightmaps for"
+    start = perf_counter()
+    world.create_heightmaps(world.zoomed_square_miles)
+    return perf_counter() - start
+
+
+BENCHMARKS = {"grid": time_grid,
+              "relative_growth": time_relative_growth,
+              "fixed_growth": time_fixed_growth,
+              "create_land": time_create_land,
+              "diagonal_scans": time_diagonal_scans,
+              "update_coastlines": time_update_coastlines,
+              "find_boundaries": time_find_boundaries,
+              "boundary_wobble": time_boundary_wobble,
+              "boundary_wobble_automaton": time_boundary_wobble_automaton,
+              "zoom_in": time_zoom_in,
+              "create_heightmaps": time_create_heightmaps}
+
+
+def run_once(benchmark: Callable[[int, int], float], regions: int, areas: int) -> float:
+    """Runs a benchmark with garbage collection turned off, like timeit does,
+    so that garbage left by earlier benchmarks is not collected during timing"""
+    gc.collect()
+    gc.disable()
+
+    try:
+        return benchmark(regions, areas)
+    finally:
+        gc.enable()
+
+
+def run(names: list[str], sizes: list[int], area_amounts: list[int],
+        repeat: int) -> dict[str, float]:
+    """Runs benchmarks for every combination of world size and area amount.
+    Returns the fastest time of each benchmark"""
+    results = {}
+
+    for name in names:
+        for regions in sizes:
+            for areas in area_amounts:
+                key = f"{name}[regions={regions},areas={areas}]"
+                results[key] = min(run_once(BENCHMARKS[name], regions, areas)
+                                   for i in range(repeat))
+                print(f"{key:<50} {results[key]:>10.4f} s", flush=True)
+    return results
+
+
+def compare(results: dict[str, float], baseline: dict[str, float],
+            tolerance: float, noise: float = 0.0) -> list[str]:
+    """Returns the benchmarks which are slower than the baseline allows.
+    A benchmark may be slower by the tolerance, a share of the baseline time,
+    and by noise seconds, so that very short benchmarks are not decided by timer noise"""
+    regressions = []
+
+    for key, time in results.items():
+        if key in baseline and time > baseline[key] * (1 + tolerance) + noise:
+            regressions.append(f"{key}: {time:.4f} s, baseline {baseline[key]:.4f} s")
+    return regressions
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Times the map generation pipeline")
+    parser.add_argument("names", nargs="*", metavar="name",
+                        help=f"benchmarks to run, all by default: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--regions", type=int, nargs="+", default=[10, 40],
+                        help="world sizes in square regions")
+    parser.add_argument("--areas", type=int, nargs="+", default=[5, 15],
+                        help="amounts of areas")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="times to run each benchmark. The fastest time is kept")
+    parser.add_argument("--baseline", default=BASELINE,
+                        help="baseline file")
+    parser.add_argument("--save", action="store_true",
+                        help="store the results in the baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown compared to the baseline")
+    parser.add_argument("--noise", type=float, default=0.002,
+                        help="seconds of slowdown allowed on top of the tolerance")
+    args = parser.parse_args(argv)
+
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name}")
+
+    results = run(args.names or list(BENCHMARKS), args.regions, args.areas, args.repeat)
+
+    if args.save:
+        baseline = {}
+
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file)
+        baseline.update(results)
+
+        with open(args.baseline, "w") as file:
+            json.dump(baseline, file, indent=4, sort_keys=True)
+            file.write("\n")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with. Run with --save to create one")
+        return 0
+
+    with open(args.baseline) as file:
+        regressions = compare(results, json.load(file), args.tolerance, args.noise)
+
+    for regression in regressions:
+        print(f"Regression in {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,30 +1,34 @@
 from grid import Grid
 from cell import Cell
-from random import choice, randrange
+from indexed_set import IndexedSet
+import random
+import numpy as np
+import wobble
 import constants as c
 
 
 class Boundary():
     """Represents the border between two terrain types or an area border"""
 
-    def __init__(self):
+    def __init__(self, rng: random.Random = None):
         """Creates an empty boundary"""
-        self.interior: list[list[Cell]] = []
-        self.exterior: list[Cell] = []
+        self.rng: random.Random = rng if rng != None else random.Random()
+        self.interior: list[IndexedSet] = []
+        self.exterior: IndexedSet = IndexedSet()
         self.discovered: set[Cell] = set()
         self.interior_terrain: int = 0
         self.exterior_terrain: int = 0
 
-    def _add(self, cell: Cell, cells: list[Cell]) -> bool:
-        """Adds a cell to a list of cells and the set of discovered cells"""
+    def _add(self, cell: Cell, cells: IndexedSet) -> bool:
+        """Adds a cell to a set of cells and the set of discovered cells"""
         if cell not in self.discovered:
-            cells.append(cell)
+            cells.add(cell)
             self.discovered.add(cell)
             return True
         else:
             return False
 
-    def _add_all(self, cells: list[Cell], destination: list[Cell]) -> None:
+    def _add_all(self, cells: list[Cell], destination: IndexedSet) -> None:
         for cell in cells:
             self._add(cell, destination)
 
@@ -32,25 +36,31 @@ class Boundary():
                               exterior_terrain: int) -> None:
         """Finds any terrain boundary.
         TODO: consider replacing this method with more precise methods"""
-        self.interior = [[]]
-        self.exterior = []
+        self.interior = [IndexedSet()]
+        self.exterior = IndexedSet()
         self.discovered = set()
         self.interior_terrain = interior_terrain
         self.exterior_terrain = exterior_terrain
 
-        for cell in grid.filter_terrain(exterior_terrain):
-            for neighbor in grid.get_close_surroundings(cell.x, cell.y):
-                if c.is_terrain(neighbor.terrain, interior_terrain):
+        cells = grid.filter_terrain(exterior_terrain)
+        interior = grid.get_neighbor_values(grid.mask(interior_terrain),
+                                            np.array([cell.x for cell in cells], int),
+                                            np.array([cell.y for cell in cells], int),
+                                            False, False)
+
+        for cell, neighbors in zip(cells, interior.tolist()):
+            for (dx, dy), is_interior in zip(c.CLOSE_OFFSETS, neighbors):
+                if is_interior:
                     self._add(cell, self.exterior)
-                    self._add(neighbor, self.interior[0])
+                    self._add(Cell(grid, cell.x + dx, cell.y + dy), self.interior[0])
 
     def find_from_sqare_miles(self, grid: Grid, square_miles: Grid,
                               interior_terrain: int, exterior_terrain: int) -> None:
         """Finds all terrain boundaries on a square kilometer level
         only when all terrain borders are set on a square mile level.
         This is useful when constructing the square kilometer grid"""
-        self.interior = [[]]
-        self.exterior = []
+        self.interior = [IndexedSet()]
+        self.exterior = IndexedSet()
         self.discovered = set()
         self.interior_terrain = interior_terrain
         self.exterior_terrain = exterior_terrain
@@ -66,14 +76,13 @@ class Boundary():
                     self._add_all(exterior, self.exterior)
                     self._add_all(interior, self.interior[0])
 
-    def get_sample(self, cells: list[Cell], quota: float) -> list[Cell]:
-        """Returns a sample of cells from a list"""
+    def get_sample(self, cells: IndexedSet, quota: float) -> list[Cell]:
+        """Removes and returns a random sample of cells from a set"""
         amount = int(len(cells) * quota)
         result = []
 
         while amount > 0:
-            index = randrange(len(cells))
-            result.append(cells.pop(index))
+            result.append(cells.pop_random(self.rng))
             amount -= 1
 
         return result
@@ -86,10 +95,8 @@ class Boundary():
         if cell not in self.discovered:
             return False
 
-        surroundings = grid.get_close_surroundings(cell.x, cell.y)
-
-        for neighbor in surroundings:
-            if neighbor != None and c.is_terrain(neighbor.terrain, neighboring_terrain):
+        for terrain in grid.get_neighbor_terrain(cell.x, cell.y, False):
+            if c.is_terrain(terrain, neighboring_terrain):
                 return False
         return True
 
@@ -102,7 +109,7 @@ class Boundary():
 
         for cell in turned:
             cell.set_terrain(self.interior_terrain)
-            self.interior[0].append(cell)
+            self.interior[0].add(cell)
             surroundings = grid.get_close_surroundings(cell.x, cell.y)
 
             for neighbor in surroundings:
@@ -124,7 +131,7 @@ class Boundary():
 
         for cell in turned:
             cell.set_terrain(self.exterior_terrain)
-            self.exterior.append(cell)
+            self.exterior.add(cell)
             surroundings = grid.get_close_surroundings(cell.x, cell.y)
 
             for neighbor in surroundings:
@@ -137,17 +144,44 @@ class Boundary():
                         self.exterior.remove(neighbor)
                         self.discovered.remove(neighbor)
 
-    def wobble(self, grid: Grid, quota: float, repetitions: int) -> None:
-        """Randomizes the boundary by shifting the terrain of random cells
+    def _set_from_masks(self, grid: Grid, interior: np.ndarray, exterior: np.ndarray) -> None:
+        """Replaces the boundary with the cells marked in two boolean arrays"""
+        self.interior = [IndexedSet()]
+        self.exterior = IndexedSet()
+        self.discovered = set()
+        self._add_all(grid.get_marked(exterior), self.exterior)
+        self._add_all(grid.get_marked(interior), self.interior[0])
+
+    def wobble(self, grid: Grid, quota: float, repetitions: int,
+               mode: str = c.SEQUENTIAL) -> None:
+        """Randomizes the boundary by shifting the terrain of random cells.
+        The sequential mode turns cells one at a time, updating the boundary
+        after each cell. The cellular automaton mode turns all sampled cells
+        at once with array operations, which is much faster on large grids.
+        It wobbles every boundary between the two terrains in the grid,
+        and each boundary cell is turned with a chance of quota
+        instead of turning an exact share of the boundary
 
         Args:
             grid: relevant grid
             quota: percentage 0 to 1, determining amount of cells affected
             repetitions: value over 1, determining how many times the cells are shifted
+            mode: SEQUENTIAL or CELLULAR_AUTOMATON
+
+        Throws:
+            ValueError
         """
-        for rep in range(repetitions):
-            self.turn_to_interior(grid, quota)
-            self.turn_to_exterior(grid, quota)
+        if mode == c.CELLULAR_AUTOMATON:
+            exterior = wobble.wobble(grid, self.rng.getrandbits(64), quota, repetitions,
+                                     self.interior_terrain, self.exterior_terrain)
+            interior = grid.mask(self.interior_terrain) & grid.expand_mask(exterior, False)
+            self._set_from_masks(grid, interior, exterior)
+        elif mode == c.SEQUENTIAL:
+            for rep in range(repetitions):
+                self.turn_to_interior(grid, quota)
+                self.turn_to_exterior(grid, quota)
+        else:
+            raise ValueError(f"Unknown wobble mode {mode}")
 
     def set_exterior_terrain(self, terrain: int) -> None:
         for cell in self.exterior:
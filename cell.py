@@ -1,35 +1,95 @@
-from typing import Self
+import math
+import numpy as np
 import constants as c
 
+# Stored in integer layers in place of None
+UNSET = np.iinfo(np.int32).min
+
+
+class Layer():
+    """Exposes a value stored in one of the grid layers as a cell attribute"""
+
+    def __init__(self, kind: type = int, optional: bool = False, visible: bool = False):
+        """Kind is the type of values returned. Optional layers may hold None.
+        Writing to a visible layer marks the cell for repainting"""
+        self.kind = kind
+        self.optional = optional
+        self.visible = visible
+        self.name: str = None
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, cell: "Cell", owner: type = None):
+        if cell is None:
+            return self
+        value = getattr(cell.grid, self.name)[cell.row, cell.column]
+
+        if self.kind == float:
+            # Elevation is rounded to whole numbers once a heightmap is finished
+            if math.isnan(value):
+                return None
+            elif value.is_integer():
+                return int(value)
+            return float(value)
+        elif self.optional and value == UNSET:
+            return None
+        return self.kind(value)
+
+    def __set__(self, cell: "Cell", value) -> None:
+        if value == None:
+            value = math.nan if self.kind == float else UNSET
+        getattr(cell.grid, self.name)[cell.row, cell.column] = value
+
+        if self.visible:
+            cell.grid.mark_dirty(cell.x, cell.y, cell.x + 1, cell.y + 1)
+
 
 class Cell():
-    """Represents a space in a rectangular grid"""
+    """Represents a space in a rectangular grid.
+    The cell holds no data of its own. All values are read from
+    and written to the layers of the grid it belongs to"""
+    __slots__ = ("grid", "x", "y", "row", "column")
 
-    def __init__(self, x: int, y: int, terrain: int):
-        """Creates a cell with the given coordinates and terrain"""
+    terrain = Layer(int, visible=True)
+    elevation = Layer(float, visible=True)
+    depth = Layer(int, optional=True)
+    mountain_depth = Layer(int, optional=True)
+    area = Layer(int)
+    active = Layer(bool)
+
+    horizontal_land_check = Layer(bool)
+    vertical_land_check = Layer(bool)
+    ascending_land_check = Layer(bool)
+    descending_land_check = Layer(bool)
+
+    horizontal_coastal_check = Layer(bool)
+    vertical_coastal_check = Layer(bool)
+    ascending_coastal_check = Layer(bool)
+    descending_coastal_check = Layer(bool)
+
+    north_boundary = Layer(bool)
+    east_boundary = Layer(bool)
+    south_boundary = Layer(bool)
+    west_boundary = Layer(bool)
+
+    def __init__(self, grid, x: int, y: int):
+        """Creates a view of the cell at the given coordinates of a grid"""
+        self.grid = grid
         self.x: int = x
         self.y: int = y
-        self.terrain: int = terrain
-        self.elevation: int = None
-        self.depth: int = None
-        self.mountain_depth: int = None
-        self.area: int = -1
-        self.active: bool = True
-
-        self.horizontal_land_check: bool = False
-        self.vertical_land_check: bool = False
-        self.ascending_land_check: bool = False
-        self.descending_land_check: bool = False
-
-        self.horizontal_coastal_check: bool = False
-        self.vertical_coastal_check: bool = False
-        self.ascending_coastal_check: bool = False
-        self.descending_coastal_check: bool = False
-
-        self.north_boundary: bool = False
-        self.east_boundary: bool = False
-        self.south_boundary: bool = False
-        self.west_boundary: bool = False
+        self.row: int = y - grid.start_y
+        self.column: int = x - grid.start_x
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Cell) and self.x == other.x and self.y == other.y \
+            and self.grid.base is other.grid.base
+
+    def __hash__(self) -> int:
+        return hash((self.x, self.y))
+
+    def __repr__(self) -> str:
+        return f"Cell({self.x}, {self.y})"
 
     def set_terrain(self, terrain: int) -> None:
         """Sets the terrain"""
@@ -71,9 +131,3 @@ class Cell():
         based on the settings of its Area"""
         return (self.horizontal_coastal_check and self.vertical_coastal_check) \
             or (self.ascending_coastal_check and self.descending_coastal_check)
-
-    def inherit(self, cell: Self) -> None:
-        """Sets cell variables based on a another cell"""
-        self.set_terrain(c.get_terrain_type(cell.terrain))
-        self.mountain_depth = cell.mountain_depth
-        self.area = cell.area
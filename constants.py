@@ -1,4 +1,5 @@
 from PyQt5.QtGui import QColor
+import numpy as np
 
 NORTH = 0
 NORTHEAST = 1
@@ -9,6 +10,10 @@ SOUTHWEST = 5
 WEST = 6
 NORTHWEST = 7
 CENTER = 8
+# Step (x, y) taken when travelling once in each direction, indexed by direction
+OFFSETS = ((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1))
+# Steps north, east, south and west
+CLOSE_OFFSETS = OFFSETS[::2]
 LAND = 9
 WATER = 10
 MOUNTAIN = 11
@@ -21,6 +26,25 @@ FLATLAND = 16
 # But this lighter hue is a bit superior than the original I think
 LAND_2 = 17
 
+# Bit of each terrain category with more than one member
+CATEGORY_BITS = {LAND: 1, WATER: 2, MOUNTAIN: 4, FLATLAND: 8}
+CATEGORY_MEMBERS = {LAND: (LAND, MOUNTAIN, CLIFFS, SHORE),
+                    WATER: (WATER, SHALLOWS, DEPTHS),
+                    MOUNTAIN: (MOUNTAIN,),
+                    FLATLAND: (FLATLAND, LAND, SHORE)}
+# Category bits of every terrain, indexed by terrain.
+# The list is for single lookups, the array for whole terrain layers
+TERRAIN_CATEGORIES = [sum(bit for category, bit in CATEGORY_BITS.items()
+                          if terrain in CATEGORY_MEMBERS[category])
+                      for terrain in range(256)]
+TERRAIN_CATEGORY_ARRAY = np.array(TERRAIN_CATEGORIES, np.uint8)
+# Terrain category of exact terrain
+TERRAIN_TYPES = {LAND: LAND, SHORE: LAND, MOUNTAIN: MOUNTAIN, CLIFFS: MOUNTAIN,
+                 WATER: WATER, SHALLOWS: WATER, DEPTHS: WATER}
+# The same for whole terrain layers. Terrain without a category is kept as it is
+TERRAIN_TYPE_ARRAY = np.arange(256, dtype=np.uint8)
+TERRAIN_TYPE_ARRAY[list(TERRAIN_TYPES)] = list(TERRAIN_TYPES.values())
+
 BORDER_COLOR = QColor(120, 90, 90)
 GRID_COLOR = QColor(150, 150, 180)
 LINE_COLOR = QColor(90, 90, 120)
@@ -77,6 +101,10 @@ SQUARE_REGION = "Square region"
 SQUARE_MILE = "Square mile"
 SQUARE_KILOMETER = "Square kilometer"
 
+# Ways of wobbling a boundary
+SEQUENTIAL = "Sequential"
+CELLULAR_AUTOMATON = "Cellular automaton"
+
 
 def get_color(terrain: int, elevation: int = None) -> QColor:
     """Retreives the color of the given terrain"""
@@ -105,45 +133,30 @@ def get_type_value(type: str) -> int:
 
 
 def is_terrain(type: int, category: int):
-    """Returns true if type belongs to the given terrain category"""
-    if type == category:
-        return True
-    elif category == LAND:
-        return type in (MOUNTAIN, CLIFFS, SHORE)
-    elif category == WATER:
-        return type in (SHALLOWS, DEPTHS)
-    elif category == FLATLAND:
-        return type in (LAND, SHORE)
-    else:
-        return False
+    """Returns true if type belongs to the given terrain category.
+    Terrain which is not a category only contains itself"""
+    if category in CATEGORY_BITS:
+        return TERRAIN_CATEGORIES[type] & CATEGORY_BITS[category] != 0
+    return type == category
+
+
+def get_terrain_mask(terrain: np.ndarray, category: int) -> np.ndarray:
+    """Returns a boolean array marking the values of a terrain array
+    which belong to the given terrain category, like is_terrain"""
+    if category in CATEGORY_BITS:
+        return TERRAIN_CATEGORY_ARRAY[terrain] & CATEGORY_BITS[category] != 0
+    return terrain == category
 
 
 def get_terrain_type(terrain: int) -> int:
     """Translates exact terrain into a terrain cathegory, LAND, MOUNTAIN or WATER"""
-    if terrain in (LAND, SHORE):
-        return LAND
-    elif terrain in (MOUNTAIN, CLIFFS):
-        return MOUNTAIN
-    elif terrain in (WATER, SHALLOWS, DEPTHS):
-        return WATER
+    return TERRAIN_TYPES.get(terrain)
 
 
 def get_next_coordinates(x: int, y: int, dir: int) -> tuple[int]:
     """Returns new coordinates (x,y) after travelling once in a direction."""
-    nx = x
-    ny = y
-
-    if dir in (NORTH, NORTHEAST, NORTHWEST):
-        ny -= 1
-    elif dir in (SOUTH, SOUTHEAST, SOUTHWEST):
-        ny += 1
-
-    if dir in (EAST, NORTHEAST, SOUTHEAST):
-        nx += 1
-    elif dir in (WEST, NORTHWEST, SOUTHWEST):
-        nx -= 1
-
-    return (nx, ny)
+    dx, dy = OFFSETS[dir]
+    return (x + dx, y + dy)
 
 
 def flip_direction(dir: int) -> int:
@@ -161,23 +174,14 @@ def angle_direction(dir: int, steps_of_eight: int) -> int:
 
 def get_surroundings(x: int, y: int) -> list[tuple[int]]:
     """Returns coordinates representing the surroundings of point (x,y) in all eight directions."""
-    result = []
-
-    for dir in range(8):
-        result.append(get_next_coordinates(x, y, dir))
-    return result
+    return [(x + dx, y + dy) for dx, dy in OFFSETS]
 
 
 def get_close_surroundings(x: int, y: int) -> list[tuple[int]]:
     """Returns coordinates representing the surroundings of point (x,y) in four directions.
     Returns a list of coordinates, corresponding to directions north, east, south, west,
     in that order"""
-    result = []
-
-    for dir in range(0, 8, 2):
-        result.append(get_next_coordinates(x, y, dir))
-
-    return result
+    return [(x + dx, y + dy) for dx, dy in CLOSE_OFFSETS]
 
 
 def get_square(x: int, y: int, dir: int) -> list[tuple[int]]:
@@ -0,0 +1,155 @@
+"""Generates heightmaps on many tiles at once, using the diamond square algorithm.
+
+Tiles follow the rules of Heightmap. A tile starting at (x, y) covers
+2**exponent + 1 cells in each direction, so neighboring tiles share their edges.
+Tiles must start on multiples of 2**exponent. Each step is performed
+on all given tiles at once. Where tiles share a cell, the first tile
+in the list decides its elevation. Cells are only given an elevation
+if their current elevation is None.
+"""
+from grid import Grid
+import numpy as np
+import constants as c
+
+# Elevation is capped at this value
+MAX_ELEVATION = 15
+# Neighbors used by the diamond step and the square step, in units of half a step
+DIAGONALS = np.array([(1, -1), (1, 1), (-1, 1), (-1, -1)])
+SIDES = np.array([(0, -1), (1, 0), (0, 1), (-1, 0)])
+
+
+def _get_weights(offsets: np.ndarray, size: int) -> np.ndarray:
+    """Returns the weight of cells at the given offsets (x, y) from the start of a tile.
+    Corner cells and cells on the middle lines have doubled weight, like in Heightmap"""
+    x = offsets[..., 0]
+    y = offsets[..., 1]
+    corner = ((x == 0) | (x == size - 1)) & ((y == 0) | (y == size - 1))
+    middle = (x == size // 2) | (y == size // 2)
+    return np.where(corner | middle, 2, 1)
+
+
+def _get_elevations(grid: Grid, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """Returns the elevation of cells. Elevation is 0 if it's None
+    or if there's no cell at the coordinate"""
+    inside = (xs >= grid.start_x) & (xs < grid.start_x + grid.length) \
+        & (ys >= grid.start_y) & (ys < grid.start_y + grid.height)
+    rows = np.clip(ys - grid.start_y, 0, grid.height - 1)
+    columns = np.clip(xs - grid.start_x, 0, grid.length - 1)
+    elevation = grid.elevation[rows, columns]
+    return np.where(inside & ~np.isnan(elevation), elevation, 0)
+
+
+def _find_vacant(grid: Grid, xs: np.ndarray, ys: np.ndarray) -> tuple[np.ndarray]:
+    """Returns the positions in xs and ys of cells within the grid
+    which have no elevation, keeping the first position of each cell,
+    and the rows and columns of those cells"""
+    xs = xs.ravel()
+    ys = ys.ravel()
+    inside = np.flatnonzero((xs >= grid.start_x) & (xs < grid.start_x + grid.length)
+                            & (ys >= grid.start_y) & (ys < grid.start_y + grid.height))
+    rows = ys[inside] - grid.start_y
+    columns = xs[inside] - grid.start_x
+    first = np.unique(rows * grid.length + columns, return_index=True)[1]
+    first.sort()
+    inside = inside[first]
+    rows = rows[first]
+    columns = columns[first]
+    vacant = np.isnan(grid.elevation[rows, columns])
+    return inside[vacant], rows[vacant], columns[vacant]
+
+
+def _fill(grid: Grid, tiles: np.ndarray, offsets: np.ndarray, neighbors: np.ndarray,
+          step: int, size: int, min_random: float, max_random: float,
+          rng: np.random.Generator) -> None:
+    """Sets the elevation of cells at the given offsets of every tile
+    to the weighted average of their neighbors. Mountains get
+    a random value from min_random to max_random added"""
+    if len(tiles) == 0 or len(offsets) == 0:
+        return
+    half = step // 2
+    # Shape (neighbor, offset, coordinate)
+    neighbor_offsets = offsets + neighbors[:, np.newaxis] * half
+    weights = _get_weights(neighbor_offsets, size)
+
+    # Shape (tile, offset)
+    xs = tiles[:, 0, np.newaxis] + offsets[:, 0]
+    ys = tiles[:, 1, np.newaxis] + offsets[:, 1]
+    positions, rows, columns = _find_vacant(grid, xs, ys)
+
+    if len(positions) == 0:
+        return
+    tile_index, offset_index = np.divmod(positions, len(offsets))
+    total = np.zeros(len(positions))
+
+    for i in range(len(neighbors)):
+        elevation = _get_elevations(grid, xs.ravel()[positions] + neighbors[i, 0] * half,
+                                    ys.ravel()[positions] + neighbors[i, 1] * half)
+        total += weights[i, offset_index] * elevation
+    value = total / weights.sum(axis=0)[offset_index]
+
+    mountains = grid.terrain[rows, columns] == c.MOUNTAIN
+    value[mountains] += min_random + rng.random(np.count_nonzero(mountains)) \
+        * (max_random - min_random)
+    grid.elevation[rows, columns] = np.minimum(value, MAX_ELEVATION)
+
+
+def diamond_offsets(step: int, size: int) -> np.ndarray:
+    """Returns the offsets of cells set by the diamond step"""
+    half = step // 2
+    x, y = np.meshgrid(np.arange(half, size, step), np.arange(half, size, step))
+    return np.stack((x.ravel(), y.ravel()), axis=1)
+
+
+def square_offsets(step: int, size: int) -> np.ndarray:
+    """Returns the offsets of cells set by the square step"""
+    half = step // 2
+    return np.array([(x, y) for x in range(0, size, half)
+                     for y in range((x + half) % step, size, step)]).reshape(-1, 2)
+
+
+def diamond_step(grid: Grid, tiles: np.ndarray, step: int, size: int,
+                 min_random: float, max_random: float, rng: np.random.Generator) -> None:
+    """Sets the middle cell of every square of the given step"""
+    _fill(grid, tiles, diamond_offsets(step, size), DIAGONALS,
+          step, size, min_random, max_random, rng)
+
+
+def square_step(grid: Grid, tiles: np.ndarray, step: int, size: int,
+                min_random: float, max_random: float, rng: np.random.Generator) -> None:
+    """Sets the middle cell of every edge of the squares of the given step"""
+    _fill(grid, tiles, square_offsets(step, size), SIDES,
+          step, size, min_random, max_random, rng)
+
+
+def randomize_corners(grid: Grid, tiles: np.ndarray, size: int,
+                      rng: np.random.Generator) -> None:
+    """Generates random starting elevations for the corners of every tile.
+    Mountains get an elevation from 0 to twice the mountain depth.
+    Other cells get elevation 0"""
+    corners = np.array([(0, 0), (size - 1, 0), (0, size - 1), (size - 1, size - 1)])
+    positions, rows, columns = _find_vacant(grid, tiles[:, 0, np.newaxis] + corners[:, 0],
+                                            tiles[:, 1, np.newaxis] + corners[:, 1])
+    mountains = grid.mask(c.MOUNTAIN)[rows, columns]
+    depth = np.maximum(grid.mountain_depth[rows, columns][mountains], 0)
+    elevation = np.zeros(len(positions))
+    elevation[mountains] = rng.integers(0, 1 + depth * 2)
+    grid.elevation[rows, columns] = np.minimum(elevation, MAX_ELEVATION)
+
+
+def round_tiles(grid: Grid, tiles: np.ndarray, size: int) -> None:
+    """Rounds all elevation values of the tiles to integers
+    and sets terrain according to elevation"""
+    covered = np.zeros(grid.terrain.shape, bool)
+
+    for x, y in tiles.tolist():
+        west = max(x - grid.start_x, 0)
+        north = max(y - grid.start_y, 0)
+        covered[north: y - grid.start_y + size, west: x - grid.start_x + size] = True
+
+    covered &= ~np.isnan(grid.elevation)
+    grid.elevation[covered] = np.round(grid.elevation[covered])
+    grid.mark_dirty_mask(covered)
+    grid.set_terrain(covered & (grid.elevation > 0), c.MOUNTAIN)
+    grid.set_terrain(covered & (grid.elevation == 0) & grid.mask(c.MOUNTAIN), c.LAND)
+    grid.set_terrain(covered & (grid.elevation < 0), c.WATER)
+
@@ -0,0 +1,133 @@
+"""Exports the whole world at square kilometer resolution.
+
+The image is written one band of regions at a time, so only a single row
+of tiles is held in memory. PNG and uncompressed TIFF are supported,
+chosen by the file extension.
+"""
+from typing import BinaryIO, Callable, Iterator
+from world import World
+import kilometer_tiles
+import renderer
+import os
+import struct
+import zlib
+import numpy as np
+
+
+def get_bands(world: World, jobs: int = 1,
+              progress: Callable[[int, int], None] = None) -> Iterator[np.ndarray]:
+    """Yields the colors of the square kilometer grid as arrays of RGB values,
+    one row of regions at a time, from north to south.
+    Exported tiles are not kept, so the tiles kept for zooming stay.
+    Progress is called with the amount of finished rows and the total after each row"""
+    regions_x = world.square_miles.length // 10
+    regions_y = world.square_miles.height // 10
+
+    for y in range(regions_y):
+        band = world.kilometers.assemble(0, y, regions_x, 1, jobs, store=False)
+        yield renderer.render(band)[:, :, :3]
+
+        if progress != None:
+            progress(y + 1, regions_y)
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    """Returns a PNG chunk with length and checksum"""
+    return struct.pack(">I", len(data)) + kind + data \
+        + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def write_png(file: BinaryIO, length: int, height: int, bands: Iterator[np.ndarray]) -> None:
+    """Writes an RGB image to a file as PNG, compressing one band at a time"""
+    file.write(b"\x89PNG\r\n\x1a\n")
+    file.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", length, height, 8, 2, 0, 0, 0)))
+    compressor = zlib.compressobj()
+
+    for band in bands:
+        # Every scanline starts with filter type 0
+        scanlines = np.zeros((band.shape[0], length * 3 + 1), np.uint8)
+        scanlines[:, 1:] = band.reshape(band.shape[0], length * 3)
+        data = compressor.compress(scanlines.tobytes())
+
+        if len(data) > 0:
+            file.write(_png_chunk(b"IDAT", data))
+
+    file.write(_png_chunk(b"IDAT", compressor.flush()))
+    file.write(_png_chunk(b"IEND", b""))
+
+
+def _tiff_entry(tag: int, kind: int, count: int, value: int) -> bytes:
+    """Returns a TIFF directory entry. Kind 3 is SHORT and kind 4 is LONG.
+    Single SHORT values are stored in the first half of the value field"""
+    if kind == 3 and count == 1:
+        return struct.pack("<HHIHH", tag, kind, count, value, 0)
+    return struct.pack("<HHII", tag, kind, count, value)
+
+
+def write_tiff(file: BinaryIO, length: int, height: int, bands: Iterator[np.ndarray],
+               rows_per_strip: int = kilometer_tiles.SIZE) -> None:
+    """Writes an RGB image to a file as uncompressed TIFF, one strip per band.
+    Every band except the last must hold rows_per_strip rows"""
+    strip_sizes = [min(rows_per_strip, height - row) * length * 3
+                   for row in range(0, height, rows_per_strip)]
+    strip_offsets = (8 + np.cumsum([0] + strip_sizes[:-1])).tolist()
+    image_end = 8 + sum(strip_sizes)
+    # The directory starts on a word boundary, right after the image
+    directory = image_end + image_end % 2
+    entries = 10
+    extra = directory + 2 + entries * 12 + 4
+    strips = len(strip_sizes)
+
+    if strips == 1:
+        offsets_value = strip_offsets[0]
+        sizes_value = strip_sizes[0]
+        bits_value = extra
+    else:
+        offsets_value = extra
+        sizes_value = extra + strips * 4
+        bits_value = extra + strips * 8
+
+    file.write(b"II" + struct.pack("<HI", 42, directory))
+
+    for band in bands:
+        file.write(np.ascontiguousarray(band).tobytes())
+
+    file.write(b"\0" * (directory - image_end))
+    file.write(struct.pack("<H", entries))
+    file.write(_tiff_entry(256, 4, 1, length))
+    file.write(_tiff_entry(257, 4, 1, height))
+    file.write(_tiff_entry(258, 3, 3, bits_value))
+    file.write(_tiff_entry(259, 3, 1, 1))
+    file.write(_tiff_entry(262, 3, 1, 2))
+    file.write(_tiff_entry(273, 4, strips, offsets_value))
+    file.write(_tiff_entry(277, 3, 1, 3))
+    file.write(_tiff_entry(278, 4, 1, rows_per_strip))
+    file.write(_tiff_entry(279, 4, strips, sizes_value))
+    file.write(_tiff_entry(284, 3, 1, 1))
+    file.write(struct.pack("<I", 0))
+
+    if strips > 1:
+        file.write(struct.pack(f"<{strips}I", *strip_offsets))
+        file.write(struct.pack(f"<{strips}I", *strip_sizes))
+    file.write(struct.pack("<3H", 8, 8, 8))
+
+
+def export_world(world: World, name: str, jobs: int = 1,
+                 progress: Callable[[int, int], None] = None) -> None:
+    """Saves the whole world at square kilometer resolution, one pixel per cell.
+    The format is given by the file name, .png, .tif or .tiff.
+    Progress is passed on to get_bands
+
+    Throws:
+        ValueError"""
+    writers = {".png": write_png, ".tif": write_tiff, ".tiff": write_tiff}
+    extension = os.path.splitext(name)[1].lower()
+
+    if extension not in writers:
+        raise ValueError(f"Unsupported image format {extension}")
+
+    length = world.square_miles.length * 10
+    height = world.square_miles.height * 10
+
+    with open(name, "wb") as file:
+        writers[extension](file, length, height, get_bands(world, jobs, progress))
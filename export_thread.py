@@ -0,0 +1,23 @@
+from PyQt5 import QtCore
+from world import World
+import export
+
+
+class ExportThread(QtCore.QThread):
+    """Exports the whole world in the background, so the window stays responsive.
+    Progress reports the amount of finished rows of regions and the total.
+    If the export fails, error holds the reason once the thread has finished"""
+    progress = QtCore.pyqtSignal(int, int)
+
+    def __init__(self, world: World, name: str, jobs: int = 1, parent: QtCore.QObject = None):
+        super().__init__(parent)
+        self.world = world
+        self.name = name
+        self.jobs = jobs
+        self.error: str = None
+
+    def run(self) -> None:
+        try:
+            export.export_world(self.world, self.name, self.jobs, self.progress.emit)
+        except (OSError, ValueError) as error:
+            self.error = str(error)
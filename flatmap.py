@@ -0,0 +1,141 @@
+"""Generates maps without opening a window.
+
+Usage:
+    python -m flatmap generate --count 100 --jobs 8 --output maps
+    python -m flatmap export --seed 1 --output world.png
+"""
+from concurrent.futures import ProcessPoolExecutor
+from world import World
+import argparse
+import os
+import random
+import renderer
+import export
+import constants as c
+
+# Wobble modes by command line name
+WOBBLE_MODES = {"automaton": c.CELLULAR_AUTOMATON, "sequential": c.SEQUENTIAL}
+
+
+def generate_world(seed: int, regions: int = 40, total_amount: int = 10,
+                   land_amount: int = 0, sea_amount: int = 0,
+                   sea_margin: float = 0.15, fixed_growth: bool = False,
+                   wobble_mode: str = c.CELLULAR_AUTOMATON) -> World:
+    """Generates a world the same way as the New map menu does"""
+    world = World(regions, seed, wobble_mode)
+    world.create_areas(total_amount=total_amount,
+                       land_amount=land_amount,
+                       sea_amount=sea_amount,
+                       sea_margin=sea_margin,
+                       fixed_growth=fixed_growth)
+    world.build_areas()
+    world.create_land()
+    world.find_boundaries(world.square_miles)
+    world.update_coastlines(world.square_miles)
+    return world
+
+
+def save_map(seed: int, output: str, **settings) -> str:
+    """Generates a world and saves the square mile map as a png image.
+    Returns the file name"""
+    world = generate_world(seed, **settings)
+    name = os.path.join(output, f"map_{seed}.png")
+    renderer.save(world.square_miles, name)
+    return name
+
+
+def _save_map(arguments: tuple) -> str:
+    seed, output, settings = arguments
+    return save_map(seed, output, **settings)
+
+
+def get_settings(args: argparse.Namespace) -> dict:
+    """Returns the world settings given on the command line"""
+    if args.seed == None:
+        args.seed = random.randrange(2 ** 32)
+
+    return {"regions": args.regions,
+            "total_amount": args.areas,
+            "land_amount": args.land,
+            "sea_amount": args.sea,
+            "sea_margin": args.sea_margin,
+            "fixed_growth": args.algorithm == "fixed"}
+
+
+def generate(args: argparse.Namespace) -> None:
+    """Generates the requested amount of maps, in parallel if jobs is above 1"""
+    settings = get_settings(args)
+    os.makedirs(args.output, exist_ok=True)
+    tasks = [(args.seed + i, args.output, settings) for i in range(args.count)]
+
+    if args.jobs > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            for name in executor.map(_save_map, tasks):
+                print(name)
+    else:
+        for task in tasks:
+            print(_save_map(task))
+
+
+def export_world(args: argparse.Namespace) -> None:
+    """Generates a world and saves it at square kilometer resolution"""
+    settings = get_settings(args)
+    world = generate_world(args.seed, wobble_mode=WOBBLE_MODES[args.wobble], **settings)
+    name = args.output if args.output != None else f"world_{args.seed}.png"
+    export.export_world(world, name, args.jobs)
+    world.close()
+    print(name)
+
+
+def add_world_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the settings of the New map menu to a command"""
+    parser.add_argument("--areas", type=int, default=10,
+                        help="total amount of areas")
+    parser.add_argument("--land", type=int, default=0,
+                        help="amount of land-only areas")
+    parser.add_argument("--sea", type=int, default=0,
+                        help="amount of sea-only areas")
+    parser.add_argument("--sea-margin", type=float, default=0.15,
+                        help="sea margin of mixed areas")
+    parser.add_argument("--algorithm", choices=("relative", "fixed"), default="relative",
+                        help="area generation algorithm, relative or fixed growth")
+    parser.add_argument("--regions", type=int, default=40,
+                        help="world length and height in square regions")
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(prog="flatmap", description="Flat map creator")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generator = commands.add_parser("generate", help="generate maps without a window")
+    add_world_arguments(generator)
+    generator.add_argument("--seed", type=int, default=None,
+                           help="seed of the first map. Following maps count upwards")
+    generator.add_argument("--count", type=int, default=1,
+                           help="amount of maps to generate")
+    generator.add_argument("--jobs", type=int, default=1,
+                           help="amount of maps to generate in parallel")
+    generator.add_argument("--output", default=".",
+                           help="directory to save maps in")
+    generator.set_defaults(function=generate)
+
+    exporter = commands.add_parser("export",
+                                   help="save a whole world at square kilometer resolution")
+    add_world_arguments(exporter)
+    exporter.add_argument("--seed", type=int, default=None,
+                          help="seed of the world")
+    exporter.add_argument("--jobs", type=int, default=1,
+                          help="amount of regions to generate in parallel")
+    exporter.add_argument("--wobble", choices=list(WOBBLE_MODES), default="automaton",
+                          help="coastline wobble. Automaton gives seamless tiles, "
+                          "sequential wobbles each band of regions one cell at a time")
+    exporter.add_argument("--output", default=None,
+                          help="image file, .png, .tif or .tiff. world_<seed>.png by default")
+    exporter.set_defaults(function=export_world)
+
+    args = parser.parse_args(argv)
+    args.function(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,240 @@
-from cell import Cell
+from cell import Cell, UNSET
+from functools import lru_cache
 from typing import Self
+import numpy as np
 import constants as c
 
+# Name, data type and default value of every grid layer.
+# Cell attributes with the same names read from these layers
+LAYERS: dict[str, tuple[type, object]] = {
+    "terrain": (np.uint8, c.WATER),
+    "elevation": (np.float64, np.nan),
+    "depth": (np.int32, UNSET),
+    "mountain_depth": (np.int32, UNSET),
+    "area": (np.int32, -1),
+    "active": (np.bool_, True),
+    "horizontal_land_check": (np.bool_, False),
+    "vertical_land_check": (np.bool_, False),
+    "ascending_land_check": (np.bool_, False),
+    "descending_land_check": (np.bool_, False),
+    "horizontal_coastal_check": (np.bool_, False),
+    "vertical_coastal_check": (np.bool_, False),
+    "ascending_coastal_check": (np.bool_, False),
+    "descending_coastal_check": (np.bool_, False),
+    "north_boundary": (np.bool_, False),
+    "east_boundary": (np.bool_, False),
+    "south_boundary": (np.bool_, False),
+    "west_boundary": (np.bool_, False)}
+
+
+@lru_cache(maxsize=4)
+def _get_neighbor_table(length: int, height: int, diagonals: bool) -> np.ndarray:
+    """Returns the flat indices of the neighbors of every cell
+    of a grid with the given size. See Grid.get_neighbor_table"""
+    rows, columns = np.divmod(np.arange(length * height), length)
+    offsets = c.OFFSETS if diagonals else c.CLOSE_OFFSETS
+    table = np.full((length * height, len(offsets)), -1, np.int32)
+
+    for i, (dx, dy) in enumerate(offsets):
+        inside = (columns + dx >= 0) & (columns + dx < length) \
+            & (rows + dy >= 0) & (rows + dy < height)
+        table[inside, i] = (rows[inside] + dy) * length + columns[inside] + dx
+    table.flags.writeable = False
+    return table
+
 
 class Grid():
-    """Represents a square area"""
+    """Represents a square area.
+    Cell values are stored in layers, one array per cell attribute,
+    indexed by [y - start_y, x - start_x]"""
 
     def __init__(self, length: int, height: int,
                  start_x: int = 0, start_y: int = 0):
         """Creates a new grid containing given amount of cells
         horizontally and vertically"""
-        self.content: dict[tuple, Cell] = {}
         self.length = length
         self.height = height
         self.start_x = start_x
         self.start_y = start_y
         self.ix: int = 0
         self.iy: int = 0
+        # The grid which owns the layers. Subgrids share layers with their base
+        self.base: Grid = self
+        # Rectangle (west, north, east, south) of cells with changed terrain or elevation,
+        # east and south exclusive. Only kept by the base grid
+        self.dirty: list[int] = None
 
-        for x in range(start_x, start_x + length):
-            for y in range(start_y, start_y + height):
-                self.add(x, y, 10)
+        for name, (dtype, default) in LAYERS.items():
+            setattr(self, name, np.full((height, length), default, dtype))
+
+    def contains(self, x: int, y: int) -> bool:
+        """Returns true if (x, y) is within the grid"""
+        return self.start_x <= x < self.start_x + self.length \
+            and self.start_y <= y < self.start_y + self.height
 
     def add(self, x: int, y: int, terrain: int) -> None:
-        """Creates a new cell at (x, y)"""
-        self.content[(x, y)] = Cell(x, y, terrain)
+        """Resets the cell at (x, y) to default values and the given terrain
+
+        Throws:
+            KeyError"""
+        cell = self.get(x, y)
+
+        for name, (dtype, default) in LAYERS.items():
+            getattr(self, name)[cell.row, cell.column] = default
+        cell.set_terrain(terrain)
 
     def add_cell(self, x: int, y: int, cell: Cell) -> None:
-        """Adds a cell at (x, y)"""
-        self.content[(x, y)] = cell
+        """Copies all values of a cell to the cell at (x, y)
+
+        Throws:
+            KeyError"""
+        target = self.get(x, y)
+
+        for name in LAYERS:
+            getattr(self, name)[target.row, target.column] = \
+                getattr(cell.grid, name)[cell.row, cell.column]
+        self.mark_dirty(x, y, x + 1, y + 1)
 
     def get(self, x: int, y: int) -> Cell:
         """Returns the cell at (x, y)
 
         Throws:
             KeyError"""
-        return self.content[(x, y)]
+        if not self.contains(x, y):
+            raise KeyError((x, y))
+        return Cell(self, x, y)
+
+    def mark_dirty(self, west: int, north: int, east: int, south: int) -> None:
+        """Marks a rectangle of cells as changed, so that they need repainting.
+        East and south are exclusive"""
+        dirty = self.base.dirty
+
+        if dirty == None:
+            self.base.dirty = [west, north, east, south]
+        else:
+            dirty[0] = min(dirty[0], west)
+            dirty[1] = min(dirty[1], north)
+            dirty[2] = max(dirty[2], east)
+            dirty[3] = max(dirty[3], south)
+
+    def mark_dirty_mask(self, mask: np.ndarray) -> None:
+        """Marks all masked cells as changed"""
+        rows = np.flatnonzero(mask.any(axis=1))
+        columns = np.flatnonzero(mask.any(axis=0))
+
+        if len(rows) > 0:
+            self.mark_dirty(self.start_x + int(columns[0]), self.start_y + int(rows[0]),
+                            self.start_x + int(columns[-1]) + 1,
+                            self.start_y + int(rows[-1]) + 1)
+
+    def take_dirty(self) -> tuple[int] | None:
+        """Returns the rectangle (west, north, east, south) of cells
+        changed since the last call, limited to this grid, and forgets it.
+        Returns None if no cells within this grid have changed"""
+        dirty = self.base.dirty
+        self.base.dirty = None
+
+        if dirty == None:
+            return None
+
+        west = max(dirty[0], self.start_x)
+        north = max(dirty[1], self.start_y)
+        east = min(dirty[2], self.start_x + self.length)
+        south = min(dirty[3], self.start_y + self.height)
+
+        if west >= east or north >= south:
+            return None
+        return (west, north, east, south)
+
+    def set_terrain(self, mask: np.ndarray, terrain: int | np.ndarray) -> np.ndarray:
+        """Sets the terrain of all masked cells. Terrain is either a single type
+        or an array of types for every cell in the grid.
+        Returns a boolean array marking the cells whose terrain changed"""
+        terrain = np.broadcast_to(np.asarray(terrain, self.terrain.dtype), self.terrain.shape)
+        changed = mask & (self.terrain != terrain)
+        self.terrain[changed] = terrain[changed]
+        self.mark_dirty_mask(changed)
+        return changed
 
     def get_all(self, positions: list[tuple[int]]) -> list[Cell]:
         """Returns a list of cells corresponding to a list of coordinates (x, y).
         If any coordinate is out-of-bounds, None is placed on that index."""
         result = []
 
-        for coordinates in positions:
-            try:
-                result.append(self.content[coordinates])
-            except KeyError:
+        for x, y in positions:
+            if self.contains(x, y):
+                result.append(Cell(self, x, y))
+            else:
                 result.append(None)
         return result
 
+    def get_index(self, x: int, y: int) -> int:
+        """Returns the flat index of (x, y), counted row by row from the start of the grid"""
+        return (y - self.start_y) * self.length + x - self.start_x
+
+    def get_neighbor_table(self, diagonals: bool = True) -> np.ndarray:
+        """Returns a read-only array holding the flat indices of the neighbors
+        of every cell, indexed by the flat index of the cell.
+        Neighbors are given in the order of directions, NORTH, NORTHEAST and so on,
+        or north, east, south and west if diagonals is false.
+        Neighbors beyond the edge of the grid have index -1.
+        Tables are shared by all grids of the same size"""
+        return _get_neighbor_table(self.length, self.height, diagonals)
+
+    def get_neighbors(self, x: int, y: int, diagonals: bool = True) -> list[int]:
+        """Returns the flat indices of the neighbors of (x, y),
+        the row of (x, y) in get_neighbor_table"""
+        return _get_neighbor_table(self.length, self.height, diagonals)[
+            (y - self.start_y) * self.length + x - self.start_x].tolist()
+
+    def get_neighbor_values(self, layer: np.ndarray, xs: np.ndarray | int, ys: np.ndarray | int,
+                            diagonals: bool = True, fill: object = 0) -> np.ndarray:
+        """Returns the values of a layer of this grid at the neighbors of cells (x, y),
+        with one row per cell and one column per direction, as in get_neighbor_table.
+        Single coordinates give a single row. Neighbors beyond the edge of the grid hold fill"""
+        indices = self.get_neighbor_table(diagonals)[
+            (np.asarray(ys) - self.start_y) * self.length + np.asarray(xs) - self.start_x]
+        rows, columns = np.divmod(np.maximum(indices, 0), self.length)
+        return np.where(indices >= 0, layer[rows, columns], fill)
+
+    def get_neighbor_terrain(self, x: int, y: int, diagonals: bool = True) -> list[int]:
+        """Returns the terrain of the neighbors of (x, y) within the grid,
+        in the order of get_neighbor_table"""
+        terrain = self.terrain
+        return [terrain.item(divmod(index, self.length))
+                for index in self.get_neighbors(x, y, diagonals) if index >= 0]
+
+    def _get_surrounding_cells(self, x: int, y: int, diagonals: bool) -> list[Cell]:
+        result = []
+
+        for index in self.get_neighbors(x, y, diagonals):
+            if index >= 0:
+                row, column = divmod(index, self.length)
+                result.append(Cell(self, column + self.start_x, row + self.start_y))
+            else:
+                result.append(None)
+        return result
+
+    def get_surroundings(self, x: int, y: int) -> list[Cell]:
+        """Returns the cells surrounding (x, y) in all eight directions.
+        None is placed on the index of neighbors beyond the edge of the grid"""
+        return self._get_surrounding_cells(x, y, True)
+
     def get_close_surroundings(self, x: int, y: int) -> list[Cell]:
-        return self.get_all(c.get_close_surroundings(x, y))
+        """Returns the cells north, east, south and west of (x, y).
+        None is placed on the index of neighbors beyond the edge of the grid"""
+        return self._get_surrounding_cells(x, y, False)
 
     def get_area(self, x: int, y: int, length: int = 10, height: int = 10) -> list[Cell]:
         """Returns a list of cells, occupying a rectangular area.
         Out of bound cells are ignored"""
         result = []
 
-        for sub_x in range(x, x + length):
-            for sub_y in range(y, y + height):
-                try:
-                    result.append(self.get(sub_x, sub_y))
-                except KeyError:
-                    pass
+        for sub_x in range(max(x, self.start_x),
+                           min(x + length, self.start_x + self.length)):
+            for sub_y in range(max(y, self.start_y),
+                               min(y + height, self.start_y + self.height)):
+                result.append(Cell(self, sub_x, sub_y))
         return result
 
     def _get_horizontal_edge(self, start_x: int, start_y: int, direction: int,
@@ -102,17 +274,62 @@ class Grid():
 
     def get_subgrid(self, x: int, y: int, length: int, height: int) -> Self:
         """Creates a new grid, containing a rectangular subset of this grid.
-        Changing cells in the new grid will affect this grid"""
-        result = Grid(length, height, x, y)
+        Changing cells in the new grid will affect this grid.
+        If the rectangle reaches beyond this grid, the new grid holds a copy
+        of the overlapping cells instead, and the rest of it is water"""
+        if self.contains(x, y) and self.contains(x + length - 1, y + height - 1):
+            result = Grid.__new__(Grid)
+            result.__dict__.update(self.__dict__)
+            result.length = length
+            result.height = height
+            result.start_x = x
+            result.start_y = y
+            window = np.s_[y - self.start_y: y - self.start_y + height,
+                           x - self.start_x: x - self.start_x + length]
 
-        for sub_x in range(x, x + length):
-            for sub_y in range(y, y + height):
-                try:
-                    result.add_cell(sub_x, sub_y, self.get(sub_x, sub_y))
-                except KeyError:
-                    pass
+            for name in LAYERS:
+                setattr(result, name, getattr(self, name)[window])
+            return result
+
+        result = Grid(length, height, x, y)
+        result.copy_from(self)
         return result
 
+    def copy_from(self, grid: Self) -> None:
+        """Copies all values of the cells of another grid
+        which overlap this grid"""
+        west = max(self.start_x, grid.start_x)
+        east = min(self.start_x + self.length, grid.start_x + grid.length)
+        north = max(self.start_y, grid.start_y)
+        south = min(self.start_y + self.height, grid.start_y + grid.height)
+
+        if west < east and north < south:
+            for name in LAYERS:
+                getattr(self, name)[north - self.start_y: south - self.start_y,
+                                    west - self.start_x: east - self.start_x] = \
+                    getattr(grid, name)[north - grid.start_y: south - grid.start_y,
+                                        west - grid.start_x: east - grid.start_x]
+
+    def inherit_from(self, grid: Self, factor: int = 10) -> np.ndarray:
+        """Sets the cells of this grid based on the cells of a coarser grid,
+        like Cell.inherit. Each cell (x, y) of the other grid covers
+        factor x factor cells of this grid, starting at (x * factor, y * factor).
+        Returns a boolean array marking the cells which were covered"""
+        columns = np.arange(self.start_x, self.start_x + self.length) // factor - grid.start_x
+        rows = np.arange(self.start_y, self.start_y + self.height) // factor - grid.start_y
+        inside_columns = (columns >= 0) & (columns < grid.length)
+        inside_rows = (rows >= 0) & (rows < grid.height)
+        covered = inside_rows[:, np.newaxis] & inside_columns
+        window = np.ix_(np.flatnonzero(inside_rows), np.flatnonzero(inside_columns))
+        source = np.ix_(rows[inside_rows], columns[inside_columns])
+
+        terrain = self.terrain.copy()
+        terrain[window] = c.TERRAIN_TYPE_ARRAY[grid.terrain[source]]
+        self.set_terrain(covered, terrain)
+        self.mountain_depth[window] = grid.mountain_depth[source]
+        self.area[window] = grid.area[source]
+        return covered
+
     def get_main_terrain(self, x: int, y: int) -> int:
         """Returns the most common terrain in the square area given by get_square(x, y, 0)"""
         terrain_count = dict[int, int] = {}
@@ -133,20 +350,56 @@ class Grid():
 
     def get_unique_terrain(self) -> list[int]:
         """Returns a list of all terrain types in this grid"""
-        result = set()
+        return [int(terrain) for terrain in np.unique(self.terrain)]
 
-        for cell in self.content.values():
-            result.add(cell.terrain)
+    def mask(self, category: int) -> np.ndarray:
+        """Returns a boolean array, marking cells
+        with terrain belonging to the given category"""
+        return c.get_terrain_mask(self.terrain, category)
 
-    def filter_terrain(self, terrain: int) -> list[Cell]:
-        """Returns a list of cells with the given terrain type"""
-        result = []
+    def expand_mask(self, mask: np.ndarray, diagonals: bool = True) -> np.ndarray:
+        """Returns a boolean array, marking cells which are masked
+        or have a masked neighbor. Neighbors are found in eight directions,
+        or four directions if diagonals is false"""
+        padded = np.pad(mask, 1)
+        result = mask.copy()
 
-        for cell in self.content.values():
-            if c.is_terrain(cell.terrain, terrain):
-                result.append(cell)
+        for dx, dy in (c.OFFSETS if diagonals else c.CLOSE_OFFSETS):
+            result |= padded[1 + dy: 1 + dy + self.height,
+                             1 + dx: 1 + dx + self.length]
         return result
 
+    def find_distances(self, sources: np.ndarray, within: np.ndarray,
+                       max_distance: int = None) -> np.ndarray:
+        """Returns an array holding the distance from each cell within the mask
+        to the nearest source cell, counted in steps in eight directions.
+        Paths only pass through cells within the mask. Cells beyond max distance,
+        unreachable cells and cells outside the mask hold 0"""
+        result = np.zeros(self.terrain.shape, np.int32)
+        current = within & self.expand_mask(sources)
+        found = current.copy()
+        distance = 1
+
+        while current.any() and (max_distance == None or distance <= max_distance):
+            result[current] = distance
+            distance += 1
+            current = self.expand_mask(current) & within & ~found
+            found |= current
+        return result
+
+    def get_marked(self, mask: np.ndarray) -> list[Cell]:
+        """Returns the cells marked in a boolean array covering this grid, row by row.
+        The cells belong to the grid this grid is a view of"""
+        rows, columns = np.nonzero(mask)
+        return [Cell(self.base, x, y) for x, y in
+                zip((columns + self.start_x).tolist(), (rows + self.start_y).tolist())]
+
+    def filter_terrain(self, terrain: int) -> list[Cell]:
+        """Returns a list of cells with the given terrain type"""
+        columns, rows = np.nonzero(self.mask(terrain).T)
+        return [Cell(self, self.start_x + int(column), self.start_y + int(row))
+                for column, row in zip(columns, rows)]
+
     def __iter__(self):
         self.ix = self.start_x
         self.iy = self.start_y
@@ -7,7 +7,7 @@ import constants as c
 class Heightmap():
     def __init__(self, grid: Grid, start_x: int, start_y: int,
                  min_random: int = -1, max_random: int = 3,
-                 exponent=4):
+                 exponent=4, rng: random.Random = None):
         """Generates a heightmap on an area of size 2**exponent + 1,
         using the diamond square algorithm.
         Corner elevation and middle point elevation is immediately set.
@@ -19,6 +19,7 @@ class Heightmap():
         A cell will only be given a new elevation if it's current elevation is None. 
         """
         self.grid = grid
+        self.rng: random.Random = rng if rng != None else random.Random()
         self.start_x: int = start_x
         self.start_y: int = start_y
         self.min_random: float = min_random
@@ -45,7 +46,7 @@ class Heightmap():
             cell = grid.get(x, y)
 
             if cell.elevation == None and c.is_terrain(cell.terrain, c.MOUNTAIN):
-                self._set_elevation(cell, random.randrange(
+                self._set_elevation(cell, self.rng.randrange(
                     0, 1 + cell.mountain_depth * 2))
             elif cell.elevation == None:
                 self._set_elevation(cell, 0)
@@ -117,7 +118,7 @@ class Heightmap():
 
     def _get_random(self, min_random: float, max_random: float) -> float:
         """Returns a random value from min_random to max_random"""
-        return min_random + random.random() * (max_random - min_random)
+        return min_random + self.rng.random() * (max_random - min_random)
 
     def _diamond_step(self, grid: Grid, start_x: int, start_y: int, size: int,
                       step: int, min_random: float, max_random: float) -> None:
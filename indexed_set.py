@@ -0,0 +1,57 @@
+import random
+
+
+class IndexedSet():
+    """A set of items kept in a list, supporting insertion, removal
+    and random selection in constant time"""
+
+    def __init__(self, items: list = ()):
+        """Creates a set containing the given items"""
+        self.items: list = []
+        self.indices: dict = {}
+
+        for item in items:
+            self.add(item)
+
+    def add(self, item) -> bool:
+        """Adds an item. Returns false if the item already exists"""
+        if item in self.indices:
+            return False
+        self.indices[item] = len(self.items)
+        self.items.append(item)
+        return True
+
+    def remove(self, item) -> None:
+        """Removes an item by moving the last item into its place
+
+        Throws:
+            KeyError"""
+        index = self.indices.pop(item)
+        last = self.items.pop()
+
+        if index < len(self.items):
+            self.items[index] = last
+            self.indices[last] = index
+
+    def discard(self, item) -> None:
+        """Removes an item if it exists"""
+        if item in self.indices:
+            self.remove(item)
+
+    def pop_random(self, rng: random.Random = random):
+        """Removes and returns a random item
+
+        Throws:
+            ValueError"""
+        item = self.items[rng.randrange(len(self.items))]
+        self.remove(item)
+        return item
+
+    def __contains__(self, item) -> bool:
+        return item in self.indices
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
@@ -0,0 +1,204 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from grid import Grid
+from boundary import Boundary
+import random
+import numpy as np
+import wobble
+import constants as c
+
+# Square kilometers along each side of a tile
+SIZE = 100
+# Coastline wobble settings
+QUOTA = 0.5
+REPETITIONS = 2
+
+
+def generate_tile(x: int, y: int, seed: int, square_miles: Grid) -> Grid:
+    """Generates the tile of the region at (x, y) from the square miles
+    of the region and the square miles bordering it within the world.
+    The tile is wobbled together with a halo of surrounding cells,
+    so it matches its neighbors without seams"""
+    margin = wobble.halo(REPETITIONS)
+    window = Grid(SIZE + margin * 2, SIZE + margin * 2, x * SIZE - margin, y * SIZE - margin)
+    inside = window.inherit_from(square_miles)
+
+    # Wobble that line! Repetitions at 2
+    # Looks blocky but if I overdo it, it gets really blurry
+    coast = wobble.wobble(window, seed, QUOTA, REPETITIONS, c.LAND, c.WATER, inside)
+    window.set_terrain(coast, c.SHALLOWS)
+
+    tile = Grid(SIZE, SIZE, x * SIZE, y * SIZE)
+    tile.copy_from(window)
+    return tile
+
+
+def _generate_tile(arguments: tuple) -> Grid:
+    return generate_tile(*arguments)
+
+
+def generate_window(x: int, y: int, length: int, height: int, seed: int,
+                    square_miles: Grid) -> Grid:
+    """Generates a rectangle of regions in one piece, wobbling the coastlines
+    one cell at a time with Boundary, like the square kilometer grid
+    was generated before it was split into tiles. Square miles must hold
+    the regions and the square miles bordering them within the world.
+    The result depends on the rectangle, so neighboring windows don't match"""
+    window = Grid(length * SIZE, height * SIZE, x * SIZE, y * SIZE)
+    window.inherit_from(square_miles)
+    boundary = Boundary(random.Random(f"{seed}/{x}/{y}"))
+    boundary.find_from_sqare_miles(window, square_miles, c.LAND, c.WATER)
+    boundary.wobble(window, QUOTA, REPETITIONS, c.SEQUENTIAL)
+    boundary.set_exterior_terrain(c.SHALLOWS)
+    return window
+
+
+class KilometerTiles():
+    """Generates the square kilometer grid one square region at a time.
+    Each tile holds 100x100 square kilometers and is generated from
+    the 10x10 square miles of its region when first needed.
+    The most recently used tiles are kept, so zooming in on the same
+    part of the world again only generates tiles never seen before.
+    Tiles depend only on the seed and the square miles around them,
+    so they can be generated in any order, in parallel, without seams.
+    Worker processes are started on first use and kept until shutdown.
+
+    With the SEQUENTIAL wobble mode, tiles are not used. Every assembled
+    rectangle is generated in one piece with generate_window instead"""
+
+    def __init__(self, square_miles: Grid, seed: int, capacity: int = 64,
+                 wobble_mode: str = c.CELLULAR_AUTOMATON):
+        """Creates an empty set of tiles for the given square mile grid.
+        At most capacity tiles are kept. Wobble mode is CELLULAR_AUTOMATON
+        or SEQUENTIAL
+
+        Throws:
+            ValueError"""
+        if wobble_mode not in (c.CELLULAR_AUTOMATON, c.SEQUENTIAL):
+            raise ValueError(f"Unknown wobble mode {wobble_mode}")
+        self.square_miles = square_miles
+        self.seed = seed
+        self.capacity = capacity
+        self.wobble_mode = wobble_mode
+        # Tiles and the square miles they were generated from,
+        # keyed by region coordinates, from least to most recently used
+        self.tiles: OrderedDict[tuple[int], tuple[Grid, tuple[np.ndarray]]] = OrderedDict()
+        self.executor: ProcessPoolExecutor = None
+        self.workers: int = 0
+
+    def get_executor(self, jobs: int) -> ProcessPoolExecutor:
+        """Returns the pool of worker processes, starting it if needed.
+        The pool is restarted if a different amount of jobs is asked for"""
+        if self.executor != None and self.workers != jobs:
+            self.shutdown()
+
+        if self.executor == None:
+            self.executor = ProcessPoolExecutor(max_workers=jobs)
+            self.workers = jobs
+        return self.executor
+
+    def shutdown(self) -> None:
+        """Stops the worker processes. They are started again when needed"""
+        if self.executor != None:
+            self.executor.shutdown()
+            self.executor = None
+            self.workers = 0
+
+    def _get_source(self, x: int, y: int, length: int = 1,
+                    height: int = 1) -> tuple[Grid, tuple[np.ndarray]]:
+        """Returns a copy of the square miles of a rectangle of regions
+        and their surroundings within the world, and the values tiles are generated from"""
+        grid = self.square_miles
+        west = max(x * 10 - 1, grid.start_x)
+        north = max(y * 10 - 1, grid.start_y)
+        east = min((x + length) * 10 + 1, grid.start_x + grid.length)
+        south = min((y + height) * 10 + 1, grid.start_y + grid.height)
+        square_miles = Grid(east - west, south - north, west, north)
+        square_miles.copy_from(grid)
+        return square_miles, (square_miles.terrain,
+                              square_miles.mountain_depth,
+                              square_miles.area)
+
+    def _is_current(self, x: int, y: int, source: tuple[np.ndarray]) -> bool:
+        """Returns true if the tile of a region exists
+        and was generated from the given values"""
+        cached = self.tiles.get((x, y))
+        return cached != None and all(np.array_equal(old, new)
+                                      for old, new in zip(cached[1], source))
+
+    def _store(self, x: int, y: int, tile: Grid, source: tuple[np.ndarray]) -> None:
+        """Keeps a tile, forgetting the least recently used tiles above capacity"""
+        self.tiles[(x, y)] = (tile, source)
+        self.tiles.move_to_end((x, y))
+
+        while len(self.tiles) > self.capacity:
+            self.tiles.popitem(last=False)
+
+    def get_tile(self, x: int, y: int) -> Grid:
+        """Returns the tile of the region at (x, y). The tile is generated
+        if it hasn't been before or if the square miles of the region
+        or its surroundings have changed since"""
+        square_miles, source = self._get_source(x, y)
+
+        if self._is_current(x, y, source):
+            self.tiles.move_to_end((x, y))
+        else:
+            self._store(x, y, generate_tile(x, y, self.seed, square_miles), source)
+        return self.tiles[(x, y)][0]
+
+    def generate(self, regions: list[tuple[int]], jobs: int = 1,
+                 store: bool = True) -> dict[tuple[int], Grid]:
+        """Returns the tiles of the given regions (x, y), keyed by region.
+        Tiles which are missing or out of date are generated,
+        in parallel processes if jobs is above 1. If store is false,
+        new tiles are not kept and the kept tiles are left as they are,
+        so one-off work like exporting the world doesn't push out recent tiles"""
+        result = {}
+        tasks = []
+        sources = []
+
+        for x, y in regions:
+            square_miles, source = self._get_source(x, y)
+
+            if self._is_current(x, y, source):
+                result[(x, y)] = self.tiles[(x, y)][0]
+
+                if store:
+                    self.tiles.move_to_end((x, y))
+            else:
+                tasks.append((x, y, self.seed, square_miles))
+                sources.append(source)
+
+        if jobs > 1 and len(tasks) > 1:
+            tiles = list(self.get_executor(jobs).map(_generate_tile, tasks))
+        else:
+            tiles = [_generate_tile(task) for task in tasks]
+
+        for task, tile, source in zip(tasks, tiles, sources):
+            result[(task[0], task[1])] = tile
+
+            if store:
+                self._store(task[0], task[1], tile, source)
+        return result
+
+    def clear(self) -> None:
+        """Forgets all tiles"""
+        self.tiles.clear()
+
+    def assemble(self, x: int, y: int, length: int, height: int, jobs: int = 1,
+                 store: bool = True) -> Grid:
+        """Returns a new square kilometer grid covering a rectangle of regions.
+        Regions outside the world are water. Store is passed on to generate.
+        With the SEQUENTIAL wobble mode, the rectangle is generated in one piece
+        by generate_window, and jobs and store are ignored"""
+        if self.wobble_mode == c.SEQUENTIAL:
+            return generate_window(x, y, length, height, self.seed, self._get_source(
+                x, y, length, height)[0])
+
+        result = Grid(length * SIZE, height * SIZE, x * SIZE, y * SIZE)
+        regions = [(tile_x, tile_y)
+                   for tile_y in range(max(y, 0), min(y + height, self.square_miles.height // 10))
+                   for tile_x in range(max(x, 0), min(x + length, self.square_miles.length // 10))]
+        for tile in self.generate(regions, jobs, store).values():
+            result.copy_from(tile)
+        return result
@@ -7,8 +7,11 @@ from area import Area
 from world import World
 from new_map_menu import NewMapMenu
 from area_options import AreaOptions
+from export_thread import ExportThread
 from grid import Grid
 from cell import Cell
+import renderer
+import os
 import constants as c
 
 
@@ -46,6 +49,7 @@ class Main(QtWidgets.QMainWindow):
 
         self.world: World = World(Main.LENGTH_DIVISION)
         self.new_map_menu: NewMapMenu = None
+        self.export_thread: ExportThread = None
         self.zoom_level: int = 1
         self.start_x: int = None
         self.start_y: int = None
@@ -59,6 +63,7 @@ class Main(QtWidgets.QMainWindow):
         # Add some buttons
         self.new_action = QtWidgets.QAction("New map", self)
         self.export_action = QtWidgets.QAction("Export", self)
+        self.export_world_action = QtWidgets.QAction("Export world", self)
         self.quit_action = QtWidgets.QAction("Quit", self)
         self.grid_view_action = QtWidgets.QAction("View grid", self)
         self.line_view_action = QtWidgets.QAction("View lines", self)
@@ -100,6 +105,12 @@ class Main(QtWidgets.QMainWindow):
         self.grid_map = QtGui.QPixmap(Main.MAP_LENGTH, Main.MAP_HEIGHT)
         self.label_map = QtGui.QPixmap(Main.MAP_LENGTH, Main.MAP_HEIGHT)
 
+        # The composition of map, grid and labels currently on screen
+        self.composed: QtGui.QPixmap = None
+        # Colors of the grid painted on the map, one RGBA value per cell
+        self.pixels = None
+        self.painted_grid: Grid = None
+
         self.map.fill(c.get_color(c.WATER))
         self.grid_map.fill(c.EMPTY_COLOR)
         self.label_map.fill(c.EMPTY_COLOR)
@@ -146,6 +157,7 @@ class Main(QtWidgets.QMainWindow):
         menu_bar.addMenu(self.file_menu)
         self.file_menu.addAction(self.new_action)
         self.file_menu.addAction(self.export_action)
+        self.file_menu.addAction(self.export_world_action)
         self.file_menu.addAction(self.quit_action)
         menu_bar.addMenu(self.view_menu)
         self.view_menu.addAction(self.grid_view_action)
@@ -156,6 +168,7 @@ class Main(QtWidgets.QMainWindow):
     def _create_actions(self):
         self.new_action.triggered.connect(self.new_map)
         self.export_action.triggered.connect(self.export)
+        self.export_world_action.triggered.connect(self.export_world)
         self.quit_action.triggered.connect(self.close)
 
         self.grid_view_action.setCheckable(True)
@@ -195,6 +208,12 @@ class Main(QtWidgets.QMainWindow):
     def _create_statusbar(self) -> None:
         self.status_bar.addPermanentWidget(self.zoom_label)
 
+    def closeEvent(self, event) -> None:
+        if self.export_thread != None:
+            self.export_thread.wait()
+        self.world.close()
+        super().closeEvent(event)
+
     # Some graphics. This one is mainly for testing
     def paint_expansion(self) -> None:
         """Paints areas. Unclaimed cells are painted black"""
@@ -220,20 +239,52 @@ class Main(QtWidgets.QMainWindow):
 
     def paint_world(self, grid: Grid) -> None:
         """Paints the terrain in the grid"""
-        pixmap = QtGui.QPixmap(grid.length, grid.height)
-        painter = QtGui.QPainter(pixmap)
-        pen = QtGui.QPen()
-        pen.setWidth(1)
-
-        for cell in grid:
-            pen.setColor(c.get_color(cell.terrain, cell.elevation))
-            painter.setPen(pen)
-            painter.drawPoint(cell.x - grid.start_x, cell.y - grid.start_y)
-
-        painter.end()
+        grid.take_dirty()
+        self.pixels = renderer.render(grid)
+        self.painted_grid = grid
+        pixmap = QtGui.QPixmap.fromImage(renderer.to_image(self.pixels))
         self.map = pixmap.scaled(Main.MAP_LENGTH, Main.MAP_HEIGHT,
                                  transformMode=Qt.TransformationMode.SmoothTransformation)
 
+    def paint_world_region(self, grid: Grid, region: tuple[int]) -> QtCore.QRect:
+        """Repaints a rectangle of cells (west, north, east, south) on the map.
+        The grid must be the one painted by paint_world.
+        The result matches a full repaint. Smooth scaling only lines up
+        between parts of the map when cells cover a whole number of pixels,
+        so otherwise the whole map is repainted.
+        Returns the repainted part of the map"""
+        if Main.MAP_LENGTH % grid.length != 0 or Main.MAP_HEIGHT % grid.height != 0:
+            self.paint_world(grid)
+            return self.map.rect()
+
+        west, north, east, south = region
+        renderer.update(grid, self.pixels, region)
+        image = renderer.to_image(self.pixels)
+        scale_x = Main.MAP_LENGTH / grid.length
+        scale_y = Main.MAP_HEIGHT / grid.height
+
+        # Scale a margin of cells around the region the same way as paint_world,
+        # so that smoothing near the edges of the region sees the surrounding cells
+        margin = 3
+        source = QtCore.QRect(west - grid.start_x - margin, north - grid.start_y - margin,
+                              east - west + margin * 2,
+                              south - north + margin * 2).intersected(image.rect())
+        band = QtGui.QPixmap.fromImage(image.copy(source)).scaled(
+            round(source.width() * scale_x), round(source.height() * scale_y),
+            transformMode=Qt.TransformationMode.SmoothTransformation)
+        # Smoothing spreads changes one cell beyond the region
+        changed = QtCore.QRectF((west - grid.start_x - 1) * scale_x,
+                                (north - grid.start_y - 1) * scale_y,
+                                (east - west + 2) * scale_x,
+                                (south - north + 2) * scale_y).toAlignedRect() \
+            .intersected(self.map.rect())
+
+        painter = QtGui.QPainter(self.map)
+        painter.setClipRect(changed)
+        painter.drawPixmap(round(source.x() * scale_x), round(source.y() * scale_y), band)
+        painter.end()
+        return changed
+
     def paint_grid(self, draw_grid: bool = True, draw_lines: bool = True,
                    draw_areas: bool = False, grid: Grid = None) -> None:
         """Draws a grid"""
@@ -298,28 +349,28 @@ class Main(QtWidgets.QMainWindow):
                                      5, location.get_text())
         painter.end()
 
-    def join_maps(self, map_1: QtGui.QPixmap, map_2: QtGui.QPixmap) -> QtGui.QPixmap:
-        result = QtGui.QPixmap(Main.MAP_LENGTH, Main.MAP_HEIGHT)
-        painter = QtGui.QPainter(result)
-        painter.drawPixmap(QtCore.QPoint(), map_1)
+    def paint(self, region: QtCore.QRect = None) -> None:
+        """Draws everything. Called through repaint methods.
+        If a region is given, only that part of the screen is redrawn"""
+        if region == None or self.composed == None:
+            self.composed = QtGui.QPixmap(Main.MAP_LENGTH, Main.MAP_HEIGHT)
+            region = self.composed.rect()
+
+        painter = QtGui.QPainter(self.composed)
+        painter.setClipRect(region)
+        painter.drawPixmap(QtCore.QPoint(), self.map)
         painter.setCompositionMode(
             QtGui.QPainter.CompositionMode.CompositionMode_SourceOver)
-        painter.drawPixmap(result.rect(), map_2, map_2.rect())
-        painter.end()
-        return result
-
-    def paint(self) -> None:
-        """Draws everything. Called through repaint methods"""
-        result = self.map
 
         if self.grid_view_action.isChecked() or self.line_view_action.isChecked() \
                 or self.area_view_action.isChecked():
-            result = self.join_maps(result, self.grid_map)
+            painter.drawPixmap(QtCore.QPoint(), self.grid_map)
 
         if self.label_view_action.isChecked():
-            result = self.join_maps(result, self.label_map)
+            painter.drawPixmap(QtCore.QPoint(), self.label_map)
+        painter.end()
 
-        self.map_screen.setPixmap(result)
+        self.map_screen.setPixmap(self.composed)
         self.update()
 
     def repaint_grid(self):
@@ -340,12 +391,21 @@ class Main(QtWidgets.QMainWindow):
         self.paint()
 
     def repaint_world(self):
-        """Repaints the map"""
+        """Repaints the cells of the map which have changed since last painted"""
         if self.zoom_level == 1:
-            self.paint_world(self.world.square_miles)
+            grid = self.world.square_miles
         elif self.zoom_level == 2:
-            self.paint_world(self.world.square_kilometers)
-        self.paint()
+            grid = self.world.square_kilometers
+
+        if grid is not self.painted_grid:
+            self.paint_world(grid)
+            self.paint()
+            return
+
+        region = grid.take_dirty()
+
+        if region != None:
+            self.paint(self.paint_world_region(grid, region))
 
     def repaint_all(self):
         """Repaints map, grid and labels."""
@@ -369,12 +429,45 @@ class Main(QtWidgets.QMainWindow):
                                                      filter=".png", initialFilter=".png")
         self.map_screen.pixmap().save(name[0] + name[1])
 
+    def export_world(self):
+        """Saves the whole world at square kilometer resolution"""
+        name = QtWidgets.QFileDialog.getSaveFileName(self, caption="Save world",
+                                                     filter=".png;;.tif", initialFilter=".png")
+
+        if name[0] == "":
+            return
+        self.status_bar.showMessage("Exporting world...")
+        # The world must not change while it is being exported
+        self.set_editing_enabled(False)
+        self.export_thread = ExportThread(self.world, name[0] + name[1],
+                                          os.cpu_count() or 1, self)
+        self.export_thread.progress.connect(self.show_export_progress)
+        self.export_thread.finished.connect(self.finish_export)
+        self.export_thread.start()
+
+    def set_editing_enabled(self, enabled: bool) -> None:
+        """Enables or disables the menus, tools and the map"""
+        self.menuBar().setEnabled(enabled)
+        self.left_tool_bar.setEnabled(enabled)
+        self.centralWidget().setEnabled(enabled)
+
+    def show_export_progress(self, done: int, total: int) -> None:
+        self.status_bar.showMessage(f"Exporting world... {done * 100 // total}%")
+
+    def finish_export(self) -> None:
+        if self.export_thread.error == None:
+            self.status_bar.showMessage(f"Saved {self.export_thread.name}")
+        else:
+            self.status_bar.showMessage(f"Export failed: {self.export_thread.error}")
+        self.export_thread = None
+        self.set_editing_enabled(True)
+
     def new_map(self):
         self.new_map_menu: NewMapMenu = NewMapMenu(self)
         self.new_map_menu.show()
 
     def finish_map_generation(self):
-        self.world.create_land()
+        self.world.create_land(os.cpu_count() or 1)
         self.world.find_boundaries(self.world.square_miles)
         self.world.update_coastlines(self.world.square_miles)
         self.new_map_menu.close()
@@ -392,6 +485,7 @@ class Main(QtWidgets.QMainWindow):
             self.timer.singleShot(100, self.expand_areas)
 
     def generate_map(self):
+        self.world.close()
         self.world = World(Main.LENGTH_DIVISION)
         self.new_map_menu.generate_button.setText("Generating...")
         self.new_map_menu.generate_button.setEnabled(False)
@@ -438,7 +532,7 @@ class Main(QtWidgets.QMainWindow):
         self.zoom_level = 2
         self.start_x = max(x - 2, 0)
         self.start_y = max(y - 2, 0)
-        self.world.zoom_in(self.start_x, self.start_y)
+        self.world.zoom_in(self.start_x, self.start_y, os.cpu_count() or 1)
         self.zoom_label.setText("High zoom: 10 km grid")
         self.zoom_in_action.setEnabled(False)
         self.zoom_out_action.setEnabled(True)
@@ -468,9 +562,9 @@ class Main(QtWidgets.QMainWindow):
         type = self.area_options.type.currentIndex()
         self.selected_area.sea_margin = self.area_options.sea_margin.value()
         self.selected_area.type = type
-        self.selected_area.create_land()
+        changed = self.selected_area.create_land()
         # self.world.update_regions_from_subregions()
-        self.world.update_coastlines(self.world.square_miles)
+        self.world.update_coastlines(self.world.square_miles, changed)
         self.repaint_world()
 
     def set_area_type(self):
@@ -479,25 +573,26 @@ class Main(QtWidgets.QMainWindow):
         type = self.area_options.type.currentIndex()
         self.selected_area.sea_margin = self.area_options.sea_margin.value()
         self.selected_area.type = type
-        self.selected_area.sink()
-        self.selected_area.create_land()
+        changed = self.selected_area.sink()
+        changed += self.selected_area.create_land()
         # self.world.update_regions_from_subregions()
-        self.world.update_coastlines(self.world.square_miles)
+        self.world.update_coastlines(self.world.square_miles, changed)
         self.repaint_world()
 
     def add_coastal_landscape(self):
         type = self.area_options.type.currentIndex()
         margin = self.area_options.sea_margin.value()
         rate = self.area_options.coastal_rate.value()
-        self.selected_area.create_coastal_landscape(type, margin, rate)
+        changed = self.selected_area.create_coastal_landscape(type, margin, rate)
         # self.world.update_regions_from_subregions()
-        self.world.update_coastlines(self.world.square_miles)
+        self.world.update_coastlines(self.world.square_miles, changed)
         self.repaint_world()
 
     def create_mountains_on_land(self):
         """Creates mountain ranges on the selected area,
         where it meets the land of a neighboring area"""
-        cells = self.selected_area.find_border_offset(
+        cells = self.world.find_border_offset(
+            self.selected_area,
             c.LAND,
             c.LAND,
             self.area_options.min_offset.value(),
@@ -512,7 +607,8 @@ class Main(QtWidgets.QMainWindow):
     def create_mountains_by_sea(self):
         """Creates mountain ranges on the selected area,
         where it meets the sea of a neighboring area"""
-        cells = self.selected_area.find_border_offset(
+        cells = self.world.find_border_offset(
+            self.selected_area,
             c.LAND,
             c.WATER,
             self.area_options.min_offset.value(),
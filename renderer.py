@@ -0,0 +1,59 @@
+from PyQt5.QtGui import QColor, QImage
+from grid import Grid
+import numpy as np
+import constants as c
+
+
+def _color_table(colors: dict[int, QColor] | list[QColor]) -> np.ndarray:
+    """Translates colors into an array of RGBA values.
+    Indices without a color are transparent"""
+    if isinstance(colors, list):
+        colors = dict(enumerate(colors))
+
+    table = np.zeros((max(colors) + 1, 4), np.uint8)
+
+    for index, color in colors.items():
+        table[index] = color.getRgb()
+    return table
+
+
+TERRAIN_COLORS = _color_table(c.COLORS)
+MOUNTAIN_COLORS = _color_table(c.MOUNTAIN_COLORS)
+
+
+def render(grid: Grid) -> np.ndarray:
+    """Returns the colors of all cells in a grid as an array of RGBA values,
+    indexed by [y - start_y, x - start_x]. Colors match constants.get_color"""
+    result = TERRAIN_COLORS[grid.terrain]
+    elevated = (grid.terrain == c.MOUNTAIN) & ~np.isnan(grid.elevation)
+
+    if elevated.any():
+        # Mountain colors are indexed by elevation - 1, like get_color does
+        elevation = grid.elevation[elevated].astype(int) - 1
+        result[elevated] = MOUNTAIN_COLORS[elevation % len(MOUNTAIN_COLORS)]
+    return result
+
+
+def update(grid: Grid, pixels: np.ndarray, region: tuple[int]) -> None:
+    """Recolors a rectangle of cells (west, north, east, south)
+    in an array returned by render. East and south are exclusive"""
+    west, north, east, south = region
+    pixels[north - grid.start_y: south - grid.start_y,
+           west - grid.start_x: east - grid.start_x] = \
+        render(grid.get_subgrid(west, north, east - west, south - north))
+
+
+def to_image(pixels: np.ndarray) -> QImage:
+    """Wraps an array of RGBA values in an image without copying it.
+    The image keeps a reference to the array"""
+    pixels = np.ascontiguousarray(pixels)
+    height, length = pixels.shape[:2]
+    image = QImage(pixels.data, length, height, length * 4, QImage.Format.Format_RGBA8888)
+    image.pixels = pixels
+    return image
+
+
+def save(grid: Grid, name: str) -> bool:
+    """Saves the terrain of a grid as an image, one pixel per cell.
+    The format is given by the file name. Returns true on success"""
+    return to_image(render(grid)).save(name)
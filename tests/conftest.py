@@ -0,0 +1,33 @@
+import os
+import sys
+
+# Modules live at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from world import World
+import pytest
+
+SEED = 7
+
+
+@pytest.fixture
+def new_world():
+    """Returns a function creating a small world with areas placed but not expanded"""
+    def create_world(fixed_growth: bool = False) -> World:
+        world = World(10, SEED)
+        world.create_areas(total_amount=8, sea_amount=1, land_amount=1,
+                           sea_margin=0.2, fixed_growth=fixed_growth)
+        return world
+    return create_world
+
+
+@pytest.fixture
+def world_map(new_world) -> World:
+    """A small world with land, coastlines and area boundaries"""
+    world = new_world()
+    world.build_areas()
+    world.create_land()
+    world.find_boundaries(world.square_miles)
+    world.update_coastlines(world.square_miles)
+    return world
@@ -0,0 +1,21 @@
+"""Checks that building areas in one pass gives the same areas
+as expanding them one tick at a time."""
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("fixed_growth", [False, True])
+def test_build_areas_matches_expand_areas(new_world, fixed_growth):
+    batch = new_world(fixed_growth)
+    batch.build_areas()
+    ticks = new_world(fixed_growth)
+
+    while not ticks.expand_areas():
+        pass
+
+    assert np.array_equal(batch.square_miles.area, ticks.square_miles.area)
+
+    for batch_area, tick_area in zip(batch.areas, ticks.areas):
+        assert {(cell.x, cell.y) for cell in batch_area.claimed_cells} \
+            == {(cell.x, cell.y) for cell in tick_area.claimed_cells}
+        assert batch_area.currency == tick_area.currency
@@ -0,0 +1,46 @@
+"""Checks that border distances found with array operations
+match distances counted one step at a time, and that the
+world-wide distance cache gives the same cells."""
+from collections import deque
+import numpy as np
+import constants as c
+
+
+def test_border_distances_match_breadth_first_search(world_map):
+    grid = world_map.square_miles
+
+    for area in world_map.areas:
+        cells = area.find_border_offset(c.LAND, c.WATER, 1, 4)
+
+        # Distances counted one step at a time in eight directions within the area
+        distances = {}
+        queue = deque()
+
+        for y in range(grid.height):
+            for x in range(grid.length):
+                if grid.area[y, x] != area.id and c.is_terrain(grid.terrain[y, x], c.WATER):
+                    queue.append((x, y, 0))
+
+        while len(queue) > 0:
+            x, y, distance = queue.popleft()
+
+            for nx, ny in c.get_surroundings(x, y):
+                if grid.contains(nx, ny) and grid.area[ny, nx] == area.id \
+                        and (nx, ny) not in distances and distance < 4:
+                    distances[(nx, ny)] = distance + 1
+                    queue.append((nx, ny, distance + 1))
+
+        expected = {(x, y) for (x, y), distance in distances.items()
+                    if c.is_terrain(grid.terrain[y, x], c.LAND)}
+        assert {(cell.x, cell.y) for cell in cells} == expected
+
+
+def test_world_border_offsets_match_area_border_offsets(world_map):
+    grid = world_map.square_miles
+
+    for area in world_map.areas:
+        cells = area.find_border_offset(c.LAND, c.WATER, 1, 4)
+        depth = grid.depth.copy()
+        cached = world_map.find_border_offset(area, c.LAND, c.WATER, 1, 4)
+        assert set(cells) == set(cached)
+        assert np.array_equal(depth, grid.depth)
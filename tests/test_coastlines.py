@@ -0,0 +1,25 @@
+"""Checks that updating the coastlines near changed cells
+gives the same terrain as updating the whole grid."""
+from grid import Grid
+import random
+import numpy as np
+import pytest
+import constants as c
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_updating_changed_cells_matches_a_full_update(world_map, seed):
+    grid = world_map.square_miles
+    rng = random.Random(seed)
+    corners = [grid.get(0, 0), grid.get(grid.length - 1, grid.height - 1)]
+    cells = corners + [grid.get(rng.randrange(grid.length), rng.randrange(grid.height))
+                       for i in range(20)]
+
+    for cell in cells:
+        cell.set_terrain(rng.choice([c.LAND, c.WATER, c.MOUNTAIN, c.SHALLOWS]))
+    full = Grid(grid.length, grid.height)
+    full.copy_from(grid)
+    world_map.update_coastlines(full)
+    world_map.update_coastlines(grid, cells)
+
+    assert np.array_equal(grid.terrain, full.terrain)
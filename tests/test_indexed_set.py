@@ -0,0 +1,46 @@
+"""Checks the set operations of IndexedSet."""
+from indexed_set import IndexedSet
+import random
+import pytest
+
+
+def test_add_ignores_existing_items():
+    items = IndexedSet([1, 2])
+
+    assert items.add(3)
+    assert not items.add(2)
+    assert list(items) == [1, 2, 3]
+
+
+def test_remove_moves_last_item_into_place():
+    items = IndexedSet([1, 2, 3, 4])
+    items.remove(2)
+
+    assert list(items) == [1, 4, 3]
+    assert 2 not in items
+    assert all(items.indices[item] == index for index, item in enumerate(items.items))
+
+    with pytest.raises(KeyError):
+        items.remove(2)
+    items.discard(2)
+    assert len(items) == 3
+
+
+def test_pop_random_removes_every_item_once():
+    items = IndexedSet(range(100))
+    rng = random.Random(1)
+    popped = [items.pop_random(rng) for i in range(100)]
+
+    assert sorted(popped) == list(range(100))
+    assert len(items) == 0
+
+    with pytest.raises(ValueError):
+        items.pop_random(rng)
+
+
+def test_pop_random_follows_the_generator():
+    first, first_rng = IndexedSet(range(50)), random.Random(3)
+    second, second_rng = IndexedSet(range(50)), random.Random(3)
+
+    assert [first.pop_random(first_rng) for i in range(10)] \
+        == [second.pop_random(second_rng) for i in range(10)]
@@ -0,0 +1,31 @@
+"""Checks that square kilometer tiles give the same grid
+however and in whatever order they are generated."""
+from grid import Grid
+import numpy as np
+import kilometer_tiles
+import wobble
+import constants as c
+
+
+def test_kilometer_tiles_do_not_depend_on_order(world_map):
+    forward = world_map.kilometers.assemble(0, 0, 3, 3)
+    world_map.kilometers.clear()
+
+    for x, y in [(2, 2), (0, 1), (1, 0)]:
+        world_map.kilometers.get_tile(x, y)
+    backward = world_map.kilometers.assemble(0, 0, 3, 3)
+    assert np.array_equal(forward.terrain, backward.terrain)
+
+
+def test_kilometer_tiles_are_seamless(world_map):
+    regions = world_map.square_miles.length // 10
+    tiled = world_map.kilometers.assemble(0, 0, regions, regions)
+
+    whole = Grid(regions * kilometer_tiles.SIZE, regions * kilometer_tiles.SIZE)
+    inside = whole.inherit_from(world_map.square_miles)
+    coast = wobble.wobble(whole, world_map.kilometers.seed, kilometer_tiles.QUOTA,
+                          kilometer_tiles.REPETITIONS, c.LAND, c.WATER, inside)
+    whole.set_terrain(coast, c.SHALLOWS)
+
+    for layer in ("terrain", "mountain_depth", "area"):
+        assert np.array_equal(getattr(tiled, layer), getattr(whole, layer)), layer
@@ -0,0 +1,72 @@
+"""Checks that the vectorized land scans mark the same cells
+as the original scans, which walked each line of an area cell by cell."""
+from grid import Grid
+import numpy as np
+import pytest
+import constants as c
+
+# Margin multipliers (first, second) of each scan, by area type
+HORIZONTAL_MARGINS = {c.WEST: (1, 1), c.CENTER: (1, 1), c.EAST: (1, 1),
+                      c.NORTHWEST: (0, 2), c.NORTH: (0, 2), c.NORTHEAST: (0, 2),
+                      c.SOUTHWEST: (2, 0), c.SOUTH: (2, 0), c.SOUTHEAST: (2, 0)}
+VERTICAL_MARGINS = {c.NORTH: (1, 1), c.CENTER: (1, 1), c.SOUTH: (1, 1),
+                    c.NORTHWEST: (0, 2), c.WEST: (0, 2), c.SOUTHWEST: (0, 2),
+                    c.NORTHEAST: (2, 0), c.EAST: (2, 0), c.SOUTHEAST: (2, 0)}
+ASCENDING_MARGINS = {c.NORTH: (0, 2), c.WEST: (0, 2), c.NORTHWEST: (0, 2),
+                     c.CENTER: (1, 1), c.NORTHEAST: (1, 1), c.SOUTHWEST: (1, 1),
+                     c.EAST: (2, 0), c.SOUTHEAST: (2, 0), c.SOUTH: (2, 0)}
+DESCENDING_MARGINS = {c.NORTH: (0, 2), c.NORTHEAST: (0, 2), c.EAST: (0, 2),
+                      c.CENTER: (1, 1), c.SOUTHEAST: (1, 1), c.NORTHWEST: (1, 1),
+                      c.SOUTH: (2, 0), c.SOUTHWEST: (2, 0), c.WEST: (2, 0)}
+
+
+def scan_lines(grid: Grid, area_id: int, key, order, margins: tuple[float]) -> np.ndarray:
+    """Marks area cells line by line like the original per-cell scans.
+    Cells are grouped into lines by key and walked in the given order"""
+    lines = {}
+
+    for y in range(grid.height):
+        for x in range(grid.length):
+            if grid.area[y, x] == area_id:
+                lines.setdefault(key(x, y), []).append((x, y))
+    result = np.zeros(grid.terrain.shape, bool)
+
+    for cells in lines.values():
+        cells.sort(key=lambda cell: order(*cell))
+        first_skip = int(len(cells) * margins[0])
+        second_skip = int(len(cells) * margins[1])
+
+        for x, y in cells[first_skip: len(cells) - second_skip]:
+            result[y, x] = True
+    return result
+
+
+@pytest.mark.parametrize("type", [c.NORTH, c.NORTHEAST, c.EAST, c.SOUTHEAST, c.SOUTH,
+                                  c.SOUTHWEST, c.WEST, c.NORTHWEST, c.CENTER])
+def test_land_scans_match_per_cell_scans(new_world, type):
+    world = new_world()
+    world.build_areas()
+    grid = world.square_miles
+    margin = 0.15
+    scans = (("horizontal_land_check", "_horizontal_land_scan", HORIZONTAL_MARGINS,
+              lambda x, y: x, lambda x, y: y),
+             ("vertical_land_check", "_vertical_land_scan", VERTICAL_MARGINS,
+              lambda x, y: y, lambda x, y: x),
+             ("ascending_land_check", "_ascending_land_scan", ASCENDING_MARGINS,
+              lambda x, y: x - y, lambda x, y: y),
+             ("descending_land_check", "_descending_land_scan", DESCENDING_MARGINS,
+              lambda x, y: x + y, lambda x, y: y))
+
+    for layer, method, margins, key, order in scans:
+        flags = getattr(grid, layer)
+        flags[:] = False
+
+        for area in world.areas:
+            getattr(area, method)(type, margin)
+
+        expected = np.zeros(grid.terrain.shape, bool)
+
+        for area in world.areas:
+            expected |= scan_lines(grid, area.id, key, order,
+                                   [m * margin for m in margins[type]])
+        assert np.array_equal(flags, expected), layer
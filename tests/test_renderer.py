@@ -0,0 +1,32 @@
+"""Checks that rendered grids have the colors the original
+per-cell painting took from constants.get_color."""
+from grid import Grid
+import numpy as np
+import renderer
+import constants as c
+
+
+def assert_matches_get_color(grid: Grid) -> None:
+    pixels = renderer.render(grid)
+
+    for cell in grid:
+        assert tuple(pixels[cell.y - grid.start_y, cell.x - grid.start_x]) \
+            == c.get_color(cell.terrain, cell.elevation).getRgb(), (cell.x, cell.y)
+
+
+def test_render_matches_get_color():
+    terrains = list(c.COLORS)
+    grid = Grid(len(c.MOUNTAIN_COLORS) + 1, len(terrains) + 1, 5, 3)
+
+    for row, terrain in enumerate(terrains):
+        grid.terrain[row, :] = terrain
+    # Mountains with every elevation, and one without a heightmap
+    grid.terrain[-1, :] = c.MOUNTAIN
+    grid.elevation[-1, :-1] = np.arange(1, len(c.MOUNTAIN_COLORS) + 1)
+    grid.elevation[:-1, :] = 3
+
+    assert_matches_get_color(grid)
+
+
+def test_render_matches_get_color_on_a_map(world_map):
+    assert_matches_get_color(world_map.square_miles)
@@ -0,0 +1,49 @@
+"""Checks the terrain lookup tables against the original
+definitions of is_terrain and get_terrain_type."""
+import numpy as np
+import constants as c
+
+
+def original_is_terrain(type: int, category: int):
+    if type == category:
+        return True
+    elif category == c.LAND:
+        return type in (c.MOUNTAIN, c.CLIFFS, c.SHORE)
+    elif category == c.WATER:
+        return type in (c.SHALLOWS, c.DEPTHS)
+    elif category == c.FLATLAND:
+        return type in (c.LAND, c.SHORE)
+    else:
+        return False
+
+
+def original_get_terrain_type(terrain: int) -> int:
+    if terrain in (c.LAND, c.SHORE):
+        return c.LAND
+    elif terrain in (c.MOUNTAIN, c.CLIFFS):
+        return c.MOUNTAIN
+    elif terrain in (c.WATER, c.SHALLOWS, c.DEPTHS):
+        return c.WATER
+
+
+def test_is_terrain_matches_original():
+    for category in range(256):
+        for type in range(256):
+            assert c.is_terrain(type, category) == original_is_terrain(type, category), \
+                (type, category)
+
+
+def test_terrain_mask_matches_original():
+    terrain = np.arange(256, dtype=np.uint8)
+
+    for category in range(256):
+        assert c.get_terrain_mask(terrain, category).tolist() \
+            == [original_is_terrain(type, category) for type in range(256)], category
+
+
+def test_get_terrain_type_matches_original():
+    for terrain in range(256):
+        expected = original_get_terrain_type(terrain)
+        assert c.get_terrain_type(terrain) == expected, terrain
+        # The array keeps terrain without a category as it is
+        assert c.TERRAIN_TYPE_ARRAY[terrain] == (terrain if expected == None else expected), terrain
@@ -0,0 +1,117 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from grid import Grid
+import numpy as np
+import diamond_square
+
+
+class TileScheduler():
+    """Generates heightmap tiles level by level, so that every tile
+    reaches a step size before any tile continues to the next.
+    Tiles are kept by their starting coordinates (x, y).
+
+    Within each step, tiles are split into four colors by the parity
+    of their position. Tiles of the same color share no cells and don't
+    read each others cells, so they can be generated in parallel"""
+
+    def __init__(self, grid: Grid, seed: int, min_random: float = -1,
+                 max_random: float = 3, exponent: int = 4, jobs: int = 1):
+        """Creates a scheduler for heightmaps of size 2**exponent + 1 on the grid.
+        Randomness depends only on the seed and the tiles, not on the amount of jobs"""
+        self.grid = grid
+        self.seed = seed
+        self.min_random = min_random
+        self.max_random = max_random
+        self.size: int = 2 ** exponent + 1
+        self.step: int = 2 ** exponent
+        self.jobs = jobs
+        # Color of every tile, keyed by starting coordinates
+        self.tiles: dict[tuple[int], int] = {}
+        # Seconds spent on each step size during the last run
+        self.timings: dict[int, float] = {}
+
+    def add(self, x: int, y: int) -> None:
+        """Adds a tile starting at (x, y)
+
+        Throws:
+            ValueError"""
+        if x % self.step != 0 or y % self.step != 0:
+            raise ValueError(f"Tile ({x}, {y}) is not aligned to {self.step} cells")
+        self.tiles[(x, y)] = x // self.step % 2 + y // self.step % 2 * 2
+
+    def __contains__(self, tile: tuple[int]) -> bool:
+        return tile in self.tiles
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+    def get_order(self) -> list[tuple[int]]:
+        """Returns the starting coordinates of all tiles, from north to south
+        and from west to east"""
+        return sorted(self.tiles, key=lambda tile: (tile[1], tile[0]))
+
+    def _get_batches(self) -> list[list[tuple[int, np.ndarray]]]:
+        """Returns the tiles of each color, split into rows from north to south.
+        Each row is given with its row number"""
+        batches = [{} for color in range(4)]
+
+        for x, y in self.get_order():
+            row = y // self.step
+            batches[self.tiles[(x, y)]].setdefault(row, []).append((x, y))
+        return [[(row, np.array(tiles)) for row, tiles in rows.items()]
+                for rows in batches]
+
+    def _run_step(self, executor: ThreadPoolExecutor, batches: list, function, step: int,
+                  min_random: float, max_random: float, phase: int) -> None:
+        """Performs a diamond or square step on all tiles, one color at a time"""
+        for color, rows in enumerate(batches):
+            def run_row(row: tuple[int, np.ndarray]) -> None:
+                # Each row has its own random generator, so rows can run in any order
+                rng = np.random.default_rng([self.seed, step, phase, color, row[0] % 2 ** 32])
+                function(self.grid, row[1], step, self.size, min_random, max_random, rng)
+
+            if executor == None:
+                for row in rows:
+                    run_row(row)
+            else:
+                list(executor.map(run_row, rows))
+
+    def _run(self, executor: ThreadPoolExecutor) -> None:
+        tiles = np.array(self.get_order()).reshape(-1, 2)
+        batches = self._get_batches()
+        min_random = self.min_random
+        max_random = self.max_random
+        step = self.step
+        start = perf_counter()
+        diamond_square.randomize_corners(self.grid, tiles, self.size,
+                                         np.random.default_rng([self.seed]))
+
+        while step > 1:
+            self._run_step(executor, batches, diamond_square.diamond_step,
+                           step, min_random, max_random, 0)
+            self._run_step(executor, batches, diamond_square.square_step,
+                           step, min_random, max_random, 1)
+            now = perf_counter()
+            self.timings[step] = now - start
+            start = now
+            min_random = min_random / 2
+            max_random = max_random / 2
+            step = step // 2
+
+        diamond_square.round_tiles(self.grid, tiles, self.size)
+        self.timings[1] = perf_counter() - start
+
+    def run(self) -> dict[int, float]:
+        """Generates all tiles. Returns the seconds spent on each step size.
+        Step size 1 is the time spent on rounding"""
+        self.timings = {}
+
+        if len(self.tiles) == 0:
+            return self.timings
+
+        if self.jobs > 1:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                self._run(executor)
+        else:
+            self._run(None)
+        return self.timings
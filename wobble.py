@@ -0,0 +1,71 @@
+"""Randomizes terrain boundaries with a cellular automaton.
+
+Whether a cell changes depends only on a seed, its coordinates and its
+neighbors, never on the order cells are processed in. Two grids covering
+the same cells therefore agree on every cell at least halo(repetitions)
+cells from their edges, so a large grid can be wobbled in overlapping tiles.
+"""
+from grid import Grid
+import numpy as np
+import constants as c
+
+# Constants of the splitmix64 generator
+GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """Scrambles 64-bit values"""
+    values = (values ^ (values >> np.uint64(30))) * MIX_1
+    values = (values ^ (values >> np.uint64(27))) * MIX_2
+    return values ^ (values >> np.uint64(31))
+
+
+def random_values(seed: int, key: int, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """Returns a random value from 0 to 1 for each coordinate (x, y).
+    Values depend only on the seed, the key and the coordinates"""
+    with np.errstate(over="ignore"):
+        values = _mix(np.uint64(seed % 2 ** 64) + np.uint64(key) * GOLDEN_GAMMA)
+        values = _mix(values + xs.astype(np.uint64) * GOLDEN_GAMMA)
+        values = _mix(values + ys.astype(np.uint64) * GOLDEN_GAMMA)
+    return (values >> np.uint64(11)) / 2 ** 53
+
+
+def halo(repetitions: int) -> int:
+    """Returns how many cells beyond a tile must be wobbled along with it
+    for the tile to match its neighbors"""
+    return 2 * repetitions + 1
+
+
+def wobble(grid: Grid, seed: int, quota: float, repetitions: int,
+           interior_terrain: int = c.LAND, exterior_terrain: int = c.WATER,
+           inside: np.ndarray = None) -> np.ndarray:
+    """Randomizes the boundary between two terrain categories, like Boundary.wobble.
+    Each repetition turns a share of exterior cells next to interior cells into
+    interior terrain, then a share of interior cells next to exterior cells into
+    exterior terrain. Quota is the chance of a boundary cell being turned.
+    Cells outside the inside mask are left alone and count as neither terrain.
+    Returns a boolean array marking exterior cells next to interior cells"""
+    if inside is None:
+        inside = np.ones(grid.terrain.shape, bool)
+
+    rows, columns = np.indices(grid.terrain.shape)
+    xs = columns + grid.start_x
+    ys = rows + grid.start_y
+    interior = grid.mask(interior_terrain) & inside
+    exterior = grid.mask(exterior_terrain) & inside
+
+    for repetition in range(repetitions):
+        turned = exterior & grid.expand_mask(interior, False) \
+            & (random_values(seed, repetition * 2, xs, ys) < quota)
+        grid.set_terrain(turned, interior_terrain)
+        interior |= turned
+        exterior &= ~turned
+
+        turned = interior & grid.expand_mask(exterior, False) \
+            & (random_values(seed, repetition * 2 + 1, xs, ys) < quota)
+        grid.set_terrain(turned, exterior_terrain)
+        exterior |= turned
+        interior &= ~turned
+    return exterior & grid.expand_mask(interior, False)
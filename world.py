@@ -1,21 +1,46 @@
 from grid import Grid
-from cell import Cell
+from cell import Cell, UNSET
 from area import Area
-from heightmap import Heightmap
-from boundary import Boundary
-from random import randrange, shuffle
+from tile_scheduler import TileScheduler
+from kilometer_tiles import KilometerTiles
+from concurrent.futures import ThreadPoolExecutor
+import random
+import numpy as np
+import math
 import constants as c
 
 
 class World():
-    def __init__(self, regions: int):
+    def __init__(self, regions: int, seed: int = None,
+                 wobble_mode: str = c.CELLULAR_AUTOMATON):
+        """Creates an empty world of regions x regions square regions.
+        All randomness is derived from the seed. A random seed is chosen if none is given.
+        Wobble mode decides how square kilometer coastlines are made, see KilometerTiles"""
+        self.seed: int = seed if seed != None else random.randrange(2 ** 32)
+        self.rng: random.Random = random.Random(self.seed)
         self.square_regions: Grid = Grid(regions, regions)
         self.square_miles: Grid = Grid(regions * 10, regions * 10)
         self.square_kilometers: Grid = None
         self.zoomed_square_miles: Grid = None
+        self.kilometers = KilometerTiles(self.square_miles,
+                                         self.get_rng("kilometers").getrandbits(64),
+                                         wobble_mode=wobble_mode)
         self.areas: list[Area] = []
         self.regions = regions
         self.fixed_growth = False
+        # Distance fields of areas and what they were calculated from,
+        # keyed by area id and external terrain
+        self.border_distances: dict[tuple[int], tuple] = {}
+
+    def close(self) -> None:
+        """Stops the worker processes used for generating square kilometers"""
+        self.kilometers.shutdown()
+
+    def get_rng(self, *keys) -> random.Random:
+        """Returns a random generator for some part of the world, such as an area.
+        The generator depends only on the world seed and the given keys,
+        so parts can be generated in any order with the same result"""
+        return random.Random("/".join(str(key) for key in (self.seed,) + keys))
 
     def create_areas(self, total_amount: int, sea_amount: int, land_amount: int,
                      sea_margin: float = 0.25, fixed_growth: bool = False) -> None:
@@ -24,8 +49,8 @@ class World():
 
         for i in range(total_amount):
             while True:
-                start_x = randrange(self.regions * 10)
-                start_y = randrange(self.regions * 10)
+                start_x = self.rng.randrange(self.regions * 10)
+                start_y = self.rng.randrange(self.regions * 10)
                 origin = self.square_miles.get(start_x, start_y)
 
                 if origin.area == -1:
@@ -38,14 +63,15 @@ class World():
                 type = c.WATER
                 sea_amount -= 1
             else:
-                type = randrange(8)
+                type = self.rng.randrange(8)
 
             self.areas.append(Area(id=i,
                                    grid=self.square_miles,
                                    start_x=start_x,
                                    start_y=start_y,
                                    type=type,
-                                   sea_margin=sea_margin))
+                                   sea_margin=sea_margin,
+                                   rng=self.get_rng("area", i)))
 
     def expand_areas(self) -> bool:
         """Expands all areas once.
@@ -65,20 +91,134 @@ class World():
 
         return finished
 
+    def _flood(self, owners: list[int], frontiers: list[list[int]]) -> list[list[int]]:
+        """Expands all areas until no vacant cells remain, following the rules
+        of Area.expand and Area.expand_blindly. Owners holds the area id
+        of each cell in row order. Frontiers holds the cell indices
+        each area can expand from. Returns the indices of the cells
+        each area expanded from, in order of expansion"""
+        length = self.square_miles.length
+        size = len(owners)
+        currencies = [area.currency for area in self.areas]
+        alive = [i for i, area in enumerate(self.areas) if area.alive]
+        expanded = [[] for area in self.areas]
+
+        while len(alive) > 0:
+            finished = []
+
+            for i in alive:
+                area = self.areas[i]
+                frontier = frontiers[i]
+                active_cells = len(frontier)
+
+                if self.fixed_growth:
+                    currencies[i] += area.growth
+                else:
+                    currencies[i] += active_cells * area.relative_growth
+
+                # Like Area.expand, growth is paid once more before the area stops
+                if active_cells == 0:
+                    finished.append(i)
+                    continue
+
+                limit = math.ceil(active_cells * 0.5)
+                claimed = []
+
+                while limit > 0 and currencies[i] > 0 and len(frontier) > 0:
+                    position = area.rng.randrange(len(frontier))
+                    index = frontier[position]
+                    frontier[position] = frontier[-1]
+                    frontier.pop()
+                    expanded[i].append(index)
+                    column = index % length
+
+                    for neighbor in (index - length if index >= length else -1,
+                                     index + 1 if column < length - 1 else -1,
+                                     index + length if index < size - length else -1,
+                                     index - 1 if column > 0 else -1):
+                        if neighbor >= 0 and owners[neighbor] == -1:
+                            owners[neighbor] = area.id
+                            claimed.append(neighbor)
+                            currencies[i] -= 1
+                    limit -= 1
+                frontier.extend(claimed)
+
+            alive = [i for i in alive if i not in finished]
+
+        for area, currency in zip(self.areas, currencies):
+            area.currency = currency
+        return expanded
+
     def build_areas(self) -> None:
-        """Expands all areas until the entire world is covered"""
-        while True:
-            if self.expand_areas():
-                break
+        """Expands all areas until the entire world is covered.
+        Areas grow exactly like they do in expand_areas, but cells are tracked
+        by index and claimed cells are collected once growth is finished.
+        Use expand_areas to watch areas grow step by step"""
+        grid = self.square_miles
+        frontiers = []
+
+        for area in self.areas:
+            frontiers.append([(cell.y - grid.start_y) * grid.length + cell.x - grid.start_x
+                              for cell in list(area.queued_cells) + area.new_cells])
+
+        owners = grid.area.ravel().tolist()
+        expanded = self._flood(owners, frontiers)
+        grid.area[:] = np.array(owners).reshape(grid.height, grid.length)
+
+        for area, indices in zip(self.areas, expanded):
+            indices = np.array([(cell.y - grid.start_y) * grid.length + cell.x - grid.start_x
+                                for cell in area.claimed_cells] + indices, dtype=int)
+            area.claim_region(indices % grid.length + grid.start_x,
+                              indices // grid.length + grid.start_y)
 
     def get_area(self, id: int) -> None:
         """Returns an area"""
         return self.areas[id]
 
-    def create_land(self) -> None:
-        """Creates land and water on all areas"""
-        for area in self.areas:
-            area.create_land()
+    def create_land(self, jobs: int = 1) -> None:
+        """Creates land and water on all areas. With more than one job,
+        areas are scanned in parallel threads. Terrain is set afterwards,
+        one area at a time"""
+        if jobs > 1:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(Area.find_land, self.areas))
+        else:
+            results = [area.find_land() for area in self.areas]
+
+        for area, result in zip(self.areas, results):
+            area.set_land(*result)
+
+    def get_border_distances(self, area: Area,
+                             external_terrain: int) -> tuple[Grid, np.ndarray, np.ndarray]:
+        """Returns a subgrid around an area, a boolean array marking the area cells
+        within it, and the distance from each area cell to the nearest out-of-area cell
+        of the given external terrain. Distances are kept until the cells of the area
+        or the external terrain around it changes"""
+        window, mask = area.get_window(1)
+        external = area.find_external_cells(window, mask, external_terrain)
+        bounds = (window.start_x, window.start_y, window.length, window.height)
+        key = (area.id, external_terrain)
+        cached = self.border_distances.get(key)
+
+        if cached != None and cached[0] == bounds and np.array_equal(cached[1], mask) \
+                and np.array_equal(cached[2], external):
+            return window, mask, cached[3]
+
+        distances = window.find_distances(external, mask)
+        self.border_distances[key] = (bounds, mask, external, distances)
+        return window, mask, distances
+
+    def find_border_offset(self, area: Area, internal_terrain: int, external_terrain: int,
+                           min_distance: int, max_distance: int) -> list[Cell]:
+        """Returns the same cells as area.find_border_offset, row by row.
+        Distances are looked up with get_border_distances, so repeated calls
+        with different distances do not search the area again.
+        Sets the depth of area cells like area.find_border_distance"""
+        window, mask, distances = self.get_border_distances(area, external_terrain)
+        distances = np.where(distances <= max_distance, distances, 0)
+        window.depth[mask] = np.where(distances[mask] > 0, distances[mask], UNSET)
+        selected = (distances > 0) & (distances >= min_distance) & window.mask(internal_terrain)
+        return window.get_marked(selected)
 
     def create_coastline(self, center: Cell, outskirts: list[Cell]):
         """Changes cell terrain to SHORE if it has LAND terrain
@@ -100,44 +240,57 @@ class World():
                     center.set_terrain(c.SHALLOWS)
                     return
 
-    def update_coastlines(self, grid: Grid) -> None:
+    def update_coastlines(self, grid: Grid, cells: list[Cell] = None) -> None:
         """Finds cell located by the coast and changes
-        their terrain to SHORE"""
-        for cell in grid:
-            surroundings = c.get_surroundings(cell.x, cell.y)
-            outskirts = grid.get_all(surroundings)
-            self.create_coastline(cell, outskirts)
+        their terrain to SHORE.
+        Gives the same result as calling create_coastline on every cell.
+        If cells are given, only those cells and their surroundings are updated.
+        Use this after changing the terrain of those cells"""
+        if cells != None:
+            self._update_coastlines_near(grid, cells)
+            return
+
+        near_land = grid.expand_mask(grid.mask(c.LAND))
+        water = (grid.terrain == c.WATER) | (grid.terrain == c.SHALLOWS)
+        grid.set_terrain(water, np.where(near_land, c.SHALLOWS, c.WATER))
+
+    def _update_coastlines_near(self, grid: Grid, cells: list[Cell]) -> None:
+        """Updates coastlines on the given cells and their surroundings"""
+        if len(cells) == 0:
+            return
+
+        xs = np.array([cell.x for cell in cells])
+        ys = np.array([cell.y for cell in cells])
+        # Updated cells may be one step from the given cells
+        # and depend on cells one step further away
+        west = max(int(xs.min()) - 2, grid.start_x)
+        north = max(int(ys.min()) - 2, grid.start_y)
+        east = min(int(xs.max()) + 3, grid.start_x + grid.length)
+        south = min(int(ys.max()) + 3, grid.start_y + grid.height)
+        window = grid.get_subgrid(west, north, east - west, south - north)
+
+        changed = np.zeros((window.height, window.length), bool)
+        changed[ys - north, xs - west] = True
+        near_land = window.expand_mask(window.mask(c.LAND))
+        water = window.expand_mask(changed) \
+            & ((window.terrain == c.WATER) | (window.terrain == c.SHALLOWS))
+        window.set_terrain(water, np.where(near_land, c.SHALLOWS, c.WATER))
 
     def find_boundaries(self, grid: Grid) -> None:
         """Finds all cells which are situated by area borders.
         Set cell variables to indicate border direction"""
-        for y in range(1, grid.height):
-            cell = grid.get(0, y)
+        # The northernmost row is not checked for east and west borders
+        horizontal = grid.area[1:, 1:] != grid.area[1:, :-1]
+        grid.east_boundary[1:, :-1] = horizontal
+        grid.west_boundary[1:, 1:] = horizontal
 
-            for x in range(1, grid.length):
-                previous = cell
-                cell = grid.get(x, y)
+        vertical = grid.area[1:, :] != grid.area[:-1, :]
+        grid.north_boundary[0, :] = False
+        grid.north_boundary[1:, :] = vertical
+        grid.south_boundary[:-1, :] = vertical
 
-                if previous.area != cell.area:
-                    previous.east_boundary = True
-                    cell.west_boundary = True
-                else:
-                    previous.east_boundary = False
-                    cell.west_boundary = False
-
-        for x in range(grid.length):
-            cell = grid.get(x, 0)
-
-            for y in range(grid.height):
-                previous = cell
-                cell = grid.get(x, y)
-
-                if previous.area != cell.area:
-                    previous.south_boundary = True
-                    cell.north_boundary = True
-                else:
-                    previous.south_boundary = False
-                    cell.north_boundary = False
+        if grid.height == 1:
+            grid.south_boundary[0, :] = False
 
     def _square_mile_to_heightmap(self, value: int, last: bool = False) -> int:
         if last:
@@ -179,67 +332,26 @@ class World():
                             self._square_mile_to_heightmap(cell.y - 1)))
         return result
 
-    def _sort_heightmaps(self, heightmaps: list[Heightmap]) -> None:
-        for i in range(len(heightmaps) - 1):
-            for j in range(1, len(heightmaps)):
-                heightmap = heightmaps[i]
-
-                if heightmaps[j].start_y < heightmap.start_y:
-                    heightmaps[i] = heightmaps[j]
-                    heightmaps[j] = heightmap
-
-    def create_heightmaps(self, square_miles: Grid) -> None:
-        """Generates heightmap on areas of 8x8 square miles,
+    def create_heightmaps(self, square_miles: Grid, jobs: int = 1) -> dict[int, float]:
+        """Generates heightmap on areas of 16x16 square kilometers,
         so that all the given mountainous cells are covered.
-        The resulting heightmaps will be 9x9 square miles,
-        overlapping neighboring cells slightly"""
-        starting_points = self.get_heightmap_coordinates(square_miles)
-        heightmaps: list[Heightmap] = []
-        coordinates = list(starting_points)
-        shuffle(coordinates)
-        finished = False
-
-        for x, y in coordinates:
-            heightmaps.append(Heightmap(self.square_kilometers, x, y,
-                                        min_random=-2, max_random=6, exponent=4))
-
-        while not finished:
-            for heightmap in heightmaps:
-                finished = heightmap.next_iteration()
+        The resulting heightmaps will be 17x17 square kilometers,
+        overlapping neighboring heightmaps slightly.
+        Returns the seconds spent on each step size"""
+        scheduler = TileScheduler(self.square_kilometers, self.get_rng("heightmaps").getrandbits(64),
+                                  min_random=-2, max_random=6, exponent=4, jobs=jobs)
 
-        # I shouldn't need this. Maybe after I've improved the algorithm
-        # self._sort_heightmaps(heightmaps)
+        for x, y in self.get_heightmap_coordinates(square_miles):
+            scheduler.add(x, y)
+        return scheduler.run()
 
-        # for heightmap in heightmaps:
-        #     heightmap.tilt()
-
-    def zoom_in(self, start_x: int, start_y: int) -> Grid:
+    def zoom_in(self, start_x: int, start_y: int, jobs: int = 1) -> Grid:
         """Generates a square kilometer grid representing
-        a zoomed-in area on the square mile grid"""
+        a zoomed-in area of 4x4 regions on the square mile grid.
+        Regions are generated once and reused by later zooms,
+        in parallel processes if jobs is above 1"""
 
-        self.square_kilometers = Grid(400, 400, start_x * 100, start_y * 100)
+        self.square_kilometers = self.kilometers.assemble(start_x, start_y, 4, 4, jobs)
         self.zoomed_square_miles = self.square_miles.get_subgrid(
             start_x * 10, start_y * 10, 40, 40)
-
-        for mile_cell in self.zoomed_square_miles:
-            mile_x = mile_cell.x * 10
-            mile_y = mile_cell.y * 10
-
-            for kilometer_cell in self.square_kilometers.get_area(mile_x, mile_y, 10, 10):
-                kilometer_cell.inherit(mile_cell)
-
-        # self.create_heightmaps(self.zoomed_square_miles)
-        boundary = Boundary()
-        boundary.find_from_sqare_miles(self.square_kilometers, self.zoomed_square_miles,
-                                       c.LAND, c.WATER)
-        # Decent
-        # Wobble that line! Repetitions at 2
-        # Looks blocky but if I overdo it, it gets really blurry
-        # Consider tweaking the algorithm
-        # Try selecting lines of land/water
-        # It might lead to a smoother result
-        # Try making newly turned cells unturnable for a short while
-        # In that case, I'd need to lower quota to less than 0.5
-        boundary.wobble(self.square_kilometers, 0.5, 2)
-        boundary.set_exterior_terrain(c.SHALLOWS)
         return self.square_kilometers